@@ -6,6 +6,7 @@ Run this script to verify your GPU setup and get installation instructions.
 
 import sys
 import os
+import argparse
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -14,10 +15,15 @@ try:
     from modules.gpu_utils import check_gpu_setup, optimize_gpu_settings
     
     if __name__ == "__main__":
+        parser = argparse.ArgumentParser(description="Check GPU setup for RAG-Crawl4AI.")
+        parser.add_argument("--full", action="store_true",
+                            help="Also load a sentence-transformers model and run a test encode (slow).")
+        args = parser.parse_args()
+        
         print("🚀 RAG-Crawl4AI GPU Setup Checker")
         print("=" * 50)
         
-        success = check_gpu_setup()
+        success = check_gpu_setup(full=args.full)
         
         if success:
             print("\n🎯 Performance Tips:")
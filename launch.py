@@ -6,6 +6,7 @@ Quick access to all tools and interfaces
 
 import os
 import sys
+import argparse
 import subprocess
 
 def print_banner():
@@ -28,7 +29,21 @@ def launch_streamlit():
 def check_gpu():
     """Run GPU setup checker."""
     print("🖥️  Checking GPU setup...")
-    subprocess.run([sys.executable, "check_gpu.py"])
+    # Run in-process rather than paying a second interpreter start for check_gpu.py
+    from src.modules.gpu_utils import check_gpu_setup
+    check_gpu_setup(full=False)
+
+PIPELINE_STEPS = ['crawl', 'kg', 'vectordb', 'qa', 'all']
+
+def run_pipeline_step(step, force=False):
+    """Run one step through src/run_pipeline.py's command line; returns its exit code."""
+    cmd = [sys.executable, "-m", "src.run_pipeline", "--step", step]
+    if force:
+        cmd.append("--force")
+    
+    print(f"\n🚀 Running pipeline step: {step}")
+    # run_pipeline imports the src package, so it runs from the project root
+    return subprocess.run(cmd, cwd=os.path.dirname(os.path.abspath(__file__))).returncode
 
 def run_pipeline():
     """Interactive pipeline runner."""
@@ -44,18 +59,13 @@ def run_pipeline():
     if step == 'back':
         return
     
-    if step in ['crawl', 'kg', 'vectordb', 'qa', 'all']:
+    if step in PIPELINE_STEPS:
         force = input("Force re-run? (y/N): ").strip().lower() == 'y'
-        cmd = [sys.executable, "run_pipeline.py", "--step", step]
-        if force:
-            cmd.append("--force")
-        
-        print(f"\n🚀 Running pipeline step: {step}")
-        subprocess.run(cmd)
+        run_pipeline_step(step, force)
     else:
         print("❌ Invalid step. Please try again.")
 
-def main():
+def interactive():
     """Main launcher menu."""
     while True:
         print_banner()
@@ -100,29 +110,37 @@ def show_status():
     print("\n📊 Project Status:")
     print("=" * 30)
     
-    # Check if output directories exist
+    # Check if output directories exist, using one directory scan instead of a stat per path
     output_dir = "output"
     markdown_dir = os.path.join(output_dir, "markdown")
     kg_file = os.path.join(output_dir, "knowledge_graph.json")
-    vector_db = os.path.join(output_dir, "vector_db")
     
-    print(f"📁 Output directory: {'✅' if os.path.exists(output_dir) else '❌'}")
-    print(f"📄 Markdown files: {'✅' if os.path.exists(markdown_dir) else '❌'}")
-    print(f"🧠 Knowledge graph: {'✅' if os.path.exists(kg_file) else '❌'}")
-    print(f"🔍 Vector database: {'✅' if os.path.exists(vector_db) else '❌'}")
+    try:
+        with os.scandir(output_dir) as it:
+            entries = {e.name: e for e in it}
+        has_output = True
+    except OSError:
+        entries, has_output = {}, False
+    has_markdown = "markdown" in entries and entries["markdown"].is_dir()
+    has_kg = "knowledge_graph.json" in entries and entries["knowledge_graph.json"].is_file()
+    
+    print(f"📁 Output directory: {'✅' if has_output else '❌'}")
+    print(f"📄 Markdown files: {'✅' if has_markdown else '❌'}")
+    print(f"🧠 Knowledge graph: {'✅' if has_kg else '❌'}")
+    print(f"🔍 Vector database: {'✅' if 'vector_db' in entries else '❌'}")
     
     # Count files if they exist
-    if os.path.exists(markdown_dir):
-        md_files = len([f for f in os.listdir(markdown_dir) if f.endswith('.md')])
+    if has_markdown:
+        with os.scandir(markdown_dir) as it:
+            md_files = sum(1 for e in it if e.name.endswith('.md'))
         print(f"   📋 Markdown files: {md_files}")
     
-    if os.path.exists(kg_file):
+    if has_kg:
         try:
-            import json
-            with open(kg_file) as f:
-                kg_data = json.load(f)
-            print(f"   🎯 Entities: {len(kg_data.get('entities', []))}")
-            print(f"   🔗 Relationships: {len(kg_data.get('relationships', []))}")
+            from src.modules.io_utils import kg_counts
+            entity_count, relationship_count = kg_counts(kg_file)
+            print(f"   🎯 Entities: {entity_count}")
+            print(f"   🔗 Relationships: {relationship_count}")
         except:
             print("   ⚠️  Knowledge graph file exists but couldn't be read")
 
@@ -136,6 +154,8 @@ def show_help():
 1. Run: python launch.py
 2. Choose option 1 for web interface
 3. Or run pipeline steps manually
+4. Or skip the menu: python launch.py --action {web,gpu,status,pipeline}
+   (pipeline without prompts: --action pipeline --step {crawl,kg,vectordb,qa,all} [--force])
 
 ⚡ Pipeline Steps:
 • crawl    - Downloads and converts web pages to markdown
@@ -167,6 +187,35 @@ def show_help():
 ⚠️  Remember: This is a prototype for demonstration purposes!
 """)
 
+def main():
+    """Run a single action from the command line, or the interactive menu if none is given."""
+    parser = argparse.ArgumentParser(description="RAG-Crawl4AI Launcher")
+    parser.add_argument("--action", choices=["web", "gpu", "status", "pipeline"],
+                        help="Run one action and exit instead of showing the menu.")
+    parser.add_argument("--step", choices=PIPELINE_STEPS,
+                        help="With --action pipeline: run this step without prompting.")
+    parser.add_argument("--force", action="store_true",
+                        help="With --step: re-run the step even if its output exists.")
+    args = parser.parse_args()
+    if (args.step or args.force) and args.action != "pipeline":
+        parser.error("--step and --force require --action pipeline")
+    if args.force and not args.step:
+        parser.error("--force requires --step")
+    
+    if args.action == "pipeline" and args.step:
+        sys.exit(run_pipeline_step(args.step, args.force))
+    
+    actions = {
+        "web": launch_streamlit,
+        "gpu": check_gpu,
+        "status": show_status,
+        "pipeline": run_pipeline,
+    }
+    if args.action:
+        actions[args.action]()
+    else:
+        interactive()
+
 if __name__ == "__main__":
     try:
         main()
@@ -10,9 +10,9 @@ from pathlib import Path
 root_dir = Path(__file__).parent
 sys.path.insert(0, str(root_dir))
 
-# Now import and run the main pipeline
-from src.run_pipeline import main
-import asyncio
-
 if __name__ == "__main__":
+    # Import lazily so the heavy pipeline modules only load when actually running
+    import asyncio
+    from src.run_pipeline import main
+
     asyncio.run(main())
@@ -11,6 +11,11 @@ ROOT_DIR = Path(__file__).parent.parent
 OUTPUT_DIR = ROOT_DIR / "output"
 MARKDOWN_DIR = OUTPUT_DIR / "markdown" / "mosdac.gov.in"
 LOG_FILE = OUTPUT_DIR / "pipeline.log"
+KG_FILE = OUTPUT_DIR / "knowledge_graph.json"  # Merged KG; per-file results are appended to the .jsonl sibling
+KG_CACHE_DIR = OUTPUT_DIR / "kg_cache"  # Extraction results keyed by markdown content hash
+EMBEDDING_CACHE_DIR = OUTPUT_DIR / "emb_cache"  # Chunk embeddings keyed by sha256(model + chunk text)
+DOC_INDEX_FILE = OUTPUT_DIR / "doc_index.sqlite3"  # Crawled markdown metadata (path, mtime, size, words, title)
+CHAT_LOG_FILE = OUTPUT_DIR / "chat_log.sqlite3"  # Streamlit Q&A history beyond the in-session window
 
 # --- Crawl Configuration ---
 URLS_TO_CRAWL = [
@@ -19,19 +24,55 @@ URLS_TO_CRAWL = [
     "https://mosdac.gov.in/global-ocean-surface-current", "https://mosdac.gov.in/data-access-policy",
     "https://mosdac.gov.in/about-us", "https://mosdac.gov.in/faq-page",
 ]
+CRAWL_CONCURRENCY = 5  # Max pages fetched in parallel (server politeness)
 
 # --- LLM Configuration ---
 LLM_PROVIDER = "gemini/gemini-2.0-flash"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_ASYNC", 5))  # Max KG extraction requests in flight
+LLM_MAX_RETRIES = 5  # Attempts per extraction request when the provider returns 429
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_RPM", 10))  # Token-bucket rate limit for KG extraction calls; raise to match your Gemini tier
+LLM_BATCH_SIZE = 4  # Max markdown pages combined into one extraction request
+LLM_BATCH_MAX_CHARS = 60000  # Keeps a batched prompt well inside the model context window
+LLM_MAX_OUTPUT_TOKENS = 16384  # Upper bound for the per-request max_tokens, which is sized to the input
+LLM_MAX_INPUT_CHARS = 50000  # Longer pages are clipped before extraction to stay inside the context window
+KG_PARSE_PROCESS_MIN_CHARS = 48_000  # LLM responses at least this long (near the max_tokens cap) are validated in a worker process, smaller ones in a thread
 
 # --- Vector DB Configuration (Pinecone) ---
 EMBEDDING_MODEL = "BAAI/bge-large-en-v1.5"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch", "onnx" or "openvino" (needs sentence-transformers[onnx] / [openvino])
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE")  # e.g. "onnx/model_qint8_avx512_vnni.onnx" for a pre-quantized export
+# Cached ONNX/OpenVINO export, one directory per model, backend and ONNX file
+_EXPORT_VARIANT = Path(EMBEDDING_ONNX_FILE).stem if EMBEDDING_ONNX_FILE else "default"
+EMBEDDING_EXPORT_DIR = OUTPUT_DIR / "embedding_models" / f"{EMBEDDING_MODEL.replace('/', '__')}__{EMBEDDING_BACKEND}__{_EXPORT_VARIANT}"
+EMBEDDING_COMPILE = True  # torch.compile the encoder for vector DB builds (CUDA, torch >= 2.1)
+EMBEDDING_PAD_MULTIPLE = 64  # Batches are padded to a multiple of this many tokens, so the compiled encoder records few CUDA graphs
+CHUNK_TOKENS = 256  # Chunk size in embedding-model tokens
+CHUNK_OVERLAP_TOKENS = 32  # Tokens shared by consecutive chunks of a document
 PINECONE_INDEX_NAME = "mosdac-rag"
 PINECONE_DIMENSION = 1024  # Dimension for BAAI/bge-large-en-v1.5
-PINECONE_METRIC = "cosine"
+PINECONE_METRIC = "dotproduct"  # Embeddings are L2-normalized, so dot product ranks exactly like cosine without the norm computation
+PINECONE_CLOUD = "aws"  # Serverless index placement, used only when the index is created
+PINECONE_REGION = "us-east-1"
 PINECONE_NAMESPACE = "mosdac"  # Namespace for organizing vectors
+PINECONE_UPSERT_BATCH_SIZE = 100  # Vectors per upsert request (Pinecone's recommended limit)
+PINECONE_MAX_IN_FLIGHT = 8  # Async upsert requests pending at once during the vector DB build
+PINECONE_POOL_THREADS = 30  # Client threads serving async upserts
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # Recent question embeddings kept in memory by the Q&A pipeline
+QUERY_EMBEDDING_CACHE_DIR = OUTPUT_DIR / "query_emb_cache"  # Question embeddings persisted across Q&A sessions
+QUERY_BATCH_MAX_SIZE = 32  # Most concurrent questions encoded in one forward pass
+QUERY_BATCH_WAIT_MS = 8  # How long the query embedder waits for more questions to batch
+QA_LLM_TIMEOUT = 30  # Seconds before a Q&A answer request times out
+QA_LLM_NUM_RETRIES = 2  # litellm retries (with backoff) for a failed Q&A answer request
+QA_USE_MMR = os.getenv("QA_USE_MMR", "0") == "1"  # Re-rank Q&A context chunks with MMR so near-duplicate chunks don't crowd the prompt
+MMR_FETCH_K = 20  # Candidates retrieved before MMR re-ranking
+MMR_LAMBDA = 0.5  # MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+QUERY_EMBEDDING_FP16 = True  # Run the Q&A embedding model in half precision on CUDA
+QUERY_EMBEDDING_INT8_CPU = os.getenv("QUERY_EMBEDDING_INT8_CPU", "0") == "1"  # Dynamic int8 quantization on CPU (small accuracy cost)
 
 # --- Knowledge Graph Configuration (Neo4j Aura) ---
 NEO4J_URI = os.getenv("NEO4J_URI", "neo4j+s://your-instance.databases.neo4j.io")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "your-password")
-NEO4J_DATABASE = "neo4j"
\ No newline at end of file
+NEO4J_DATABASE = "neo4j"
+NEO4J_BATCH_SIZE = 5000  # Graphs up to this many rows are written in a single transaction
+NEO4J_TRANSACTION_ROWS = 1000  # Rows per server-side transaction (CALL ... IN TRANSACTIONS) for larger graphs
\ No newline at end of file
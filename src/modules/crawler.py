@@ -1,46 +1,37 @@
 # src/modules/crawler.py
 import asyncio
 import logging
-from pathlib import Path
-from urllib.parse import urlparse
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 from src import config
-
-def save_markdown_content(result):
-    """Saves the markdown content of a crawl result to a file."""
-    try:
-        parsed_url = urlparse(result.url)
-        path_str = parsed_url.path.strip("/")
-        if not path_str or result.url.endswith('/'):
-            page_dir = config.MARKDOWN_DIR / path_str
-            file_name = "index.md"
-        else:
-            parts = path_str.split('/')
-            page_dir = config.MARKDOWN_DIR / Path(*parts[:-1])
-            file_name = f"{parts[-1]}.md"
-        page_dir.mkdir(parents=True, exist_ok=True)
-        md_path = page_dir / file_name
-        md_path.write_text(result.markdown.raw_markdown, encoding="utf-8")
-        logging.info(f"  -> Saved markdown to: {md_path}")
-    except Exception as e:
-        logging.error(f"  -> Error saving markdown for {result.url}: {e}")
+from src.modules.io_utils import save_markdown_content
 
 async def run_crawl():
     """Crawls the predefined list of URLs and saves their markdown content."""
     logging.info(f"Starting crawl for {len(config.URLS_TO_CRAWL)} pages.")
-    browser_config = BrowserConfig(headless=True)
     run_config = CrawlerRunConfig(
         cache_mode=CacheMode.ENABLED,
         markdown_generator=DefaultMarkdownGenerator(options={"ignore_links": True})
     )
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        for url in config.URLS_TO_CRAWL:
-            logging.info(f"Crawling: {url}")
-            result = await crawler.arun(url=url, config=run_config)
+    # Bound the number of in-flight fetches to stay polite to the server
+    sem = asyncio.Semaphore(config.CRAWL_CONCURRENCY)
+
+    # One headless browser serves every page of the crawl and is closed when it ends
+    async with AsyncWebCrawler(config=BrowserConfig(headless=True)) as crawler:
+        async def _one(url):
+            async with sem:
+                logging.info(f"Crawling: {url}")
+                result = await crawler.arun(url=url, config=run_config)
+            # Save outside the semaphore so the next fetch can start during disk I/O
             if result.success and result.markdown and result.markdown.raw_markdown:
-                save_markdown_content(result)
+                await save_markdown_content(result)
             else:
                 logging.error(f"Failed to crawl or get markdown for {url}: {result.error_message}")
+
+        results = await asyncio.gather(*[_one(u) for u in config.URLS_TO_CRAWL], return_exceptions=True)
+
+    for url, result in zip(config.URLS_TO_CRAWL, results):
+        if isinstance(result, Exception):
+            logging.error(f"Failed to crawl {url}: {result}")
     logging.info("Crawl finished.")
\ No newline at end of file
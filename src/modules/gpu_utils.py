@@ -5,6 +5,7 @@ import sys
 import logging
 import subprocess
 import platform
+from pathlib import Path
 
 def get_device():
     """Detect and return the best available device for PyTorch operations."""
@@ -30,11 +31,22 @@ def get_device():
         # Return a simple string identifier when torch is not available
         return "cpu"
 
-def check_gpu_setup():
+def check_gpu_setup(full=True):
     """Comprehensive GPU setup checker and installation guide."""
     print("🔍 GPU Setup Checker")
     print("=" * 50)
     
+    if not quick_gpu_report():
+        return False
+    
+    if full and not full_gpu_benchmark():
+        return False
+    
+    print("\n🎉 GPU setup verification complete!")
+    return True
+
+def quick_gpu_report():
+    """Report PyTorch, CUDA and MPS availability without loading a model."""
     # Check CUDA availability
     try:
         import torch
@@ -64,8 +76,13 @@ def check_gpu_setup():
         print_pytorch_installation_guide()
         return False
     
+    return True
+
+def full_gpu_benchmark():
+    """Load a small sentence-transformers model and run a test encode on the best device."""
     # Test embedding model with GPU
     try:
+        import torch
         from sentence_transformers import SentenceTransformer
         print("\n🧪 Testing GPU with sentence-transformers...")
         
@@ -88,7 +105,6 @@ def check_gpu_setup():
         print(f"❌ GPU test failed: {e}")
         return False
     
-    print("\n🎉 GPU setup verification complete!")
     return True
 
 def print_pytorch_installation_guide():
@@ -135,8 +151,8 @@ def optimize_gpu_settings():
             torch.backends.cudnn.benchmark = True
             torch.backends.cudnn.deterministic = False
             
-            # Set memory allocation strategy
-            os.environ['PYTORCH_CUDA_ALLOC_CONF'] = 'max_split_size_mb:128'
+            # Set memory allocation strategy (expandable segments limit fragmentation as batch shapes vary)
+            os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True,max_split_size_mb:128')
             
             print("✅ GPU optimizations applied:")
             print("   - CuDNN benchmark enabled")
@@ -148,6 +164,80 @@ def optimize_gpu_settings():
     
     return False
 
+def optimize_embedding_model(model, device, fp16=True, int8_on_cpu=False):
+    """Prepare a SentenceTransformer for inference: FP16 on CUDA, optional dynamic int8 on CPU."""
+    try:
+        import torch
+        
+        device_type = getattr(device, "type", str(device))
+        if device_type == "cuda" and fp16:
+            model = model.half()
+            logging.info("Embedding model cast to FP16 for inference")
+        elif device_type == "cpu" and int8_on_cpu:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            logging.info("Embedding model quantized to int8 (dynamic) for CPU inference")
+    except Exception as e:
+        logging.warning(f"Could not optimize embedding model, using full precision: {e}")
+    
+    return model
+
+def compile_embedding_model(model, device):
+    """Compile the transformer inside a PyTorch-backend SentenceTransformer with torch.compile (CUDA, torch >= 2.1)."""
+    try:
+        import torch
+        
+        version = tuple(int(part) for part in torch.__version__.split("+")[0].split(".")[:2])
+        if getattr(device, "type", str(device)) != "cuda" or version < (2, 1):
+            return model
+        # dynamic=True keeps one compiled graph across batch and sequence lengths; reduce-overhead records a
+        # CUDA graph per input shape, which stays cheap because batches are padded to a few length buckets
+        model[0].auto_model = torch.compile(model[0].auto_model, mode="reduce-overhead", dynamic=True)
+        logging.info("Embedding model compiled with torch.compile")
+    except Exception as e:
+        logging.warning(f"Could not compile embedding model, running eagerly: {e}")
+    
+    return model
+
+def embedding_setup_key(model_name, device, backend="torch", onnx_file=None, fp16=True, int8_on_cpu=False):
+    """Identify everything that changes the vectors load_embedding_model's model produces (for cache keys)."""
+    device_type = getattr(device, "type", str(device))
+    return "\0".join(str(part) for part in (
+        model_name, backend, onnx_file, device_type, f"fp16={fp16}", f"int8_cpu={int8_on_cpu}", "normalized"
+    ))
+
+def load_embedding_model(model_name, device, backend="torch", export_dir=None, onnx_file=None,
+                         fp16=True, int8_on_cpu=False):
+    """Load a SentenceTransformer for inference with the PyTorch, ONNX Runtime or OpenVINO backend."""
+    from sentence_transformers import SentenceTransformer
+    
+    device_type = getattr(device, "type", str(device))
+    
+    if backend in ("onnx", "openvino"):
+        model_kwargs = {}
+        if backend == "onnx":
+            model_kwargs["provider"] = "CUDAExecutionProvider" if device_type == "cuda" else "CPUExecutionProvider"
+            if onnx_file:
+                model_kwargs["file_name"] = onnx_file
+        
+        # Reuse an earlier export instead of converting the model again on every start
+        if export_dir and Path(export_dir).exists():
+            logging.info(f"Loading exported {backend} embedding model from {export_dir}")
+            return SentenceTransformer(str(export_dir), device=device, backend=backend, model_kwargs=model_kwargs)
+        
+        model = SentenceTransformer(model_name, device=device, backend=backend, model_kwargs=model_kwargs)
+        if export_dir:
+            model.save(str(export_dir))
+            logging.info(f"Saved exported {backend} embedding model to {export_dir}")
+        return model
+    
+    # PyTorch backend: load weights directly in half precision on CUDA
+    model_kwargs = {}
+    if device_type == "cuda" and fp16:
+        import torch
+        model_kwargs["torch_dtype"] = torch.float16
+    model = SentenceTransformer(model_name, device=device, model_kwargs=model_kwargs)
+    return optimize_embedding_model(model, device, fp16=False, int8_on_cpu=int8_on_cpu)
+
 def get_recommended_batch_size():
     """Get recommended batch size based on available GPU memory."""
     try:
@@ -0,0 +1,115 @@
+# src/modules/io_utils.py
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+from src import config
+
+def _compute_md_path(url):
+    """Maps a page URL to the (directory, file name) its markdown is saved under."""
+    parsed_url = urlparse(url)
+    path_str = parsed_url.path.strip("/")
+    if not path_str or url.endswith('/'):
+        return config.MARKDOWN_DIR / path_str, "index.md"
+    parts = path_str.split('/')
+    return config.MARKDOWN_DIR / Path(*parts[:-1]), f"{parts[-1]}.md"
+
+# Output paths for the known crawl list, computed once at import
+_URL_TO_PATH = {u: _compute_md_path(u) for u in config.URLS_TO_CRAWL}
+
+def _save_markdown_sync(result):
+    """Writes the markdown content of a crawl result to disk (blocking)."""
+    try:
+        page_dir, file_name = _URL_TO_PATH.get(result.url) or _compute_md_path(result.url)
+        page_dir.mkdir(parents=True, exist_ok=True)
+        md_path = page_dir / file_name
+        md_path.write_bytes(result.markdown.raw_markdown.encode("utf-8"))
+        logging.info(f"  -> Saved markdown to: {md_path}")
+        index_document(md_path, result.markdown.raw_markdown)
+    except Exception as e:
+        logging.error(f"  -> Error saving markdown for {result.url}: {e}")
+
+async def save_markdown_content(result):
+    """Saves the markdown content of a crawl result without blocking the event loop."""
+    await asyncio.to_thread(_save_markdown_sync, result)
+
+# --- KNOWLEDGE GRAPH FILE ---
+
+def kg_counts(kg_file):
+    """Count entities and relationships in the KG JSON without building the whole object tree
+    (streams with ijson when installed, otherwise parses with orjson)."""
+    try:
+        import ijson
+    except ImportError:
+        import orjson
+        with open(kg_file, 'rb') as f:
+            kg_data = orjson.loads(f.read())
+        return len(kg_data.get('entities', [])), len(kg_data.get('relationships', []))
+    
+    entity_count = relationship_count = 0
+    with open(kg_file, 'rb') as f:
+        for prefix, event, _ in ijson.parse(f):
+            if event == "start_map":
+                if prefix == "entities.item":
+                    entity_count += 1
+                elif prefix == "relationships.item":
+                    relationship_count += 1
+    return entity_count, relationship_count
+
+# --- DOCUMENT INDEX ---
+# SQLite sidecar with per-document metadata, so the document browser can list files
+# without walking the markdown tree
+
+_DOC_INDEX_LOCK = threading.Lock()
+
+def _open_doc_index():
+    config.DOC_INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(config.DOC_INDEX_FILE)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS docs "
+        "(path TEXT PRIMARY KEY, mtime REAL, size INTEGER, words INTEGER, title TEXT)"
+    )
+    return conn
+
+def _doc_title(markdown):
+    """First markdown heading of a document, or an empty string."""
+    for line in markdown.splitlines():
+        if line.startswith("#"):
+            return line.lstrip("#").strip()
+    return ""
+
+def _index_row(md_path, markdown):
+    stat = md_path.stat()
+    return (
+        md_path.relative_to(config.MARKDOWN_DIR).as_posix(),
+        stat.st_mtime, stat.st_size, len(markdown.split()), _doc_title(markdown)
+    )
+
+def index_document(md_path, markdown):
+    """Record (or update) one saved markdown file in the document index."""
+    try:
+        with _DOC_INDEX_LOCK:
+            conn = _open_doc_index()
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)", _index_row(md_path, markdown))
+            finally:
+                conn.close()
+    except Exception as e:
+        logging.error(f"  -> Error indexing {md_path}: {e}")
+
+def rebuild_doc_index():
+    """Re-index every markdown file on disk, dropping rows for files that no longer exist."""
+    with _DOC_INDEX_LOCK:
+        conn = _open_doc_index()
+        try:
+            with conn:
+                conn.execute("DELETE FROM docs")
+                conn.executemany(
+                    "INSERT INTO docs VALUES (?, ?, ?, ?, ?)",
+                    (_index_row(p, p.read_text(encoding="utf-8")) for p in config.MARKDOWN_DIR.rglob("*.md"))
+                )
+        finally:
+            conn.close()
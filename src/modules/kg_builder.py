@@ -1,49 +1,120 @@
 # src/modules/kg_builder.py
 
 import asyncio
+import atexit
+import concurrent.futures
+import functools
+import hashlib
 import os
 import logging
-import json
+import multiprocessing
+import orjson
 import re
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 from typing import List
 
 # LiteLLM for making a direct, controlled API call
 from litellm import acompletion
 import litellm
+from aiolimiter import AsyncLimiter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter, before_sleep_log
 
 # Neo4j for knowledge graph storage
 from neo4j import GraphDatabase
 
 from src import config
 
+# Token bucket shared by all extraction calls so only the LLM requests are rate limited
+llm_limiter = AsyncLimiter(max_rate=config.LLM_REQUESTS_PER_MINUTE, time_period=60)
+
+# Process pool for validating very large LLM responses, created on first use. Workers are spawned,
+# not forked, since the parent may be threaded (Streamlit, litellm/httpx clients)
+_POOL = None
+
+def _get_process_pool():
+    """Return the shared process pool, starting it once per process."""
+    global _POOL
+    if _POOL is None:
+        _POOL = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        atexit.register(_POOL.shutdown)
+    return _POOL
+
 # --- NORMALIZATION FUNCTIONS ---
+# ASCII separators (whitespace and - . / \) mapped to "_" in a single translate pass
+_SEPARATOR_TABLE = str.maketrans(
+    {c: "_" for c in "-./\\" + "".join(chr(i) for i in range(128) if chr(i).isspace())}
+)
+_NAME_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+
+# Patterns compiled once at import
+_SEPARATOR_RE = re.compile(r'[-\s\.\/\\]+')
+_INVALID_CHARS_RE = re.compile(r'[^a-z0-9_]+')
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+_RELATION_SEPARATOR_RE = re.compile(r'[-\s]+')
+
 def normalize_name(text: str) -> str:
     """Normalize entity/relationship names to consistent snake_case format."""
     if not text or not isinstance(text, str):
         return ""
+    return _normalize_name_cached(text)
+
+# The same canonical entities (MOSDAC, INSAT-3D, ...) recur on most pages, so results are memoized
+@functools.lru_cache(maxsize=8192)
+def _normalize_name_cached(text: str) -> str:
+    # Trim whitespace and convert to lowercase
+    text = text.strip().lower()
     
-    # Trim whitespace
-    text = text.strip()
-    
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Replace spaces, hyphens, and other separators with underscores
-    text = re.sub(r'[-\s\.\/\\]+', '_', text)
-    
-    # Remove special characters except underscores and alphanumeric
-    text = re.sub(r'[^a-z0-9_]', '', text)
+    if text.isascii():
+        # Replace separators with underscores, then drop special characters only if any remain
+        text = text.translate(_SEPARATOR_TABLE)
+        if not _NAME_CHARS.issuperset(text):
+            text = _INVALID_CHARS_RE.sub('', text)
+    else:
+        # Non-ASCII text may contain Unicode whitespace, which only the regex recognizes
+        text = _SEPARATOR_RE.sub('_', text)
+        text = _INVALID_CHARS_RE.sub('', text)
     
     # Remove multiple consecutive underscores
-    text = re.sub(r'_+', '_', text)
+    if '__' in text:
+        text = _MULTI_UNDERSCORE_RE.sub('_', text)
     
     # Remove leading/trailing underscores
     text = text.strip('_')
     
-    return text
+    # Intern so the same entity seen across pages shares one string and hashes once
+    return sys.intern(text)
+
+# Common type mappings for consistency
+_TYPE_MAPPINGS = {
+    'organization': 'organization',
+    'org': 'organization',
+    'company': 'organization',
+    'institution': 'organization',
+    'satellite': 'satellite',
+    'sat': 'satellite',
+    'spacecraft': 'satellite',
+    'instrument': 'instrument',
+    'sensor': 'instrument',
+    'data_product': 'data_product',
+    'product': 'data_product',
+    'dataset': 'data_product',
+    'parameter': 'parameter',
+    'param': 'parameter',
+    'measurement': 'parameter',
+    'mission': 'mission',
+    'program': 'mission',
+    'service': 'service',
+    'application': 'application',
+    'app': 'application',
+    'technology': 'technology',
+    'tech': 'technology'
+}
 
 def normalize_type(text: str) -> str:
     """Normalize entity types to consistent format."""
@@ -53,33 +124,53 @@ def normalize_type(text: str) -> str:
     # Trim and convert to lowercase
     text = text.strip().lower()
     
-    # Common type mappings for consistency
-    type_mappings = {
-        'organization': 'organization',
-        'org': 'organization',
-        'company': 'organization',
-        'institution': 'organization',
-        'satellite': 'satellite',
-        'sat': 'satellite',
-        'spacecraft': 'satellite',
-        'instrument': 'instrument',
-        'sensor': 'instrument',
-        'data_product': 'data_product',
-        'product': 'data_product',
-        'dataset': 'data_product',
-        'parameter': 'parameter',
-        'param': 'parameter',
-        'measurement': 'parameter',
-        'mission': 'mission',
-        'program': 'mission',
-        'service': 'service',
-        'application': 'application',
-        'app': 'application',
-        'technology': 'technology',
-        'tech': 'technology'
-    }
-    
-    return type_mappings.get(text, text)
+    return _TYPE_MAPPINGS.get(text, text)
+
+# Common relation mappings for consistency
+_RELATION_MAPPINGS = {
+    'operates': 'operates',
+    'runs': 'operates',
+    'manages': 'operates',
+    'launches': 'launches',
+    'deployed': 'launches',
+    'carries': 'carries',
+    'hosts': 'carries',
+    'contains': 'carries',
+    'measures': 'measures',
+    'observes': 'measures',
+    'detects': 'measures',
+    'monitors': 'measures',
+    'provides': 'provides',
+    'supplies': 'provides',
+    'offers': 'provides',
+    'processes': 'processes',
+    'analyzes': 'processes',
+    'handles': 'processes',
+    'archives': 'archives',
+    'stores': 'archives',
+    'maintains': 'archives',
+    'distributes': 'distributes',
+    'disseminates': 'distributes',
+    'shares': 'distributes',
+    'supports': 'supports',
+    'enables': 'supports',
+    'facilitates': 'supports',
+    'develops': 'develops',
+    'creates': 'develops',
+    'builds': 'develops',
+    'collects': 'collects',
+    'gathers': 'collects',
+    'acquires': 'collects',
+    'transmits': 'transmits',
+    'sends': 'transmits',
+    'broadcasts': 'transmits',
+    'generates': 'generates',
+    'produces': 'generates',
+    'creates': 'generates',
+    'validates': 'validates',
+    'verifies': 'validates',
+    'calibrates': 'calibrates'
+}
 
 def normalize_relation(text: str) -> str:
     """Normalize relationship names to consistent format."""
@@ -89,90 +180,123 @@ def normalize_relation(text: str) -> str:
     # Trim and convert to lowercase
     text = text.strip().lower()
     
-    # Common relation mappings for consistency
-    relation_mappings = {
-        'operates': 'operates',
-        'runs': 'operates',
-        'manages': 'operates',
-        'launches': 'launches',
-        'deployed': 'launches',
-        'carries': 'carries',
-        'hosts': 'carries',
-        'contains': 'carries',
-        'measures': 'measures',
-        'observes': 'measures',
-        'detects': 'measures',
-        'monitors': 'measures',
-        'provides': 'provides',
-        'supplies': 'provides',
-        'offers': 'provides',
-        'processes': 'processes',
-        'analyzes': 'processes',
-        'handles': 'processes',
-        'archives': 'archives',
-        'stores': 'archives',
-        'maintains': 'archives',
-        'distributes': 'distributes',
-        'disseminates': 'distributes',
-        'shares': 'distributes',
-        'supports': 'supports',
-        'enables': 'supports',
-        'facilitates': 'supports',
-        'develops': 'develops',
-        'creates': 'develops',
-        'builds': 'develops',
-        'collects': 'collects',
-        'gathers': 'collects',
-        'acquires': 'collects',
-        'transmits': 'transmits',
-        'sends': 'transmits',
-        'broadcasts': 'transmits',
-        'generates': 'generates',
-        'produces': 'generates',
-        'creates': 'generates',
-        'validates': 'validates',
-        'verifies': 'validates',
-        'calibrates': 'calibrates'
-    }
-    
     # Replace spaces and hyphens with underscores
-    text = re.sub(r'[-\s]+', '_', text)
+    text = _RELATION_SEPARATOR_RE.sub('_', text)
     
-    return relation_mappings.get(text, text)
+    return _RELATION_MAPPINGS.get(text, text)
 
 # --- PYDANTIC MODELS ---
 class Entity(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     name: str = Field(description="A specific and unique name for the entity.")
     type: str = Field(description="The category of the entity (e.g., 'Satellite', 'Mission').")
     
-    def __init__(self, **data):
-        # Normalize name and type before validation
-        if 'name' in data:
-            data['name'] = normalize_name(data['name'])
-        if 'type' in data:
-            data['type'] = normalize_type(data['type'])
-        super().__init__(**data)
+    # Normalize name and type before validation (also runs for nested data in model_validate)
+    @field_validator('name', mode='before')
+    @classmethod
+    def _normalize_name(cls, v):
+        return normalize_name(v)
+    
+    @field_validator('type', mode='before')
+    @classmethod
+    def _normalize_type(cls, v):
+        return normalize_type(v)
 
 class Relationship(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     source: str = Field(description="The name of the source entity.")
     target: str = Field(description="The name of the target entity.")
     relation: str = Field(description="A descriptive verb phrase for the relationship.")
     
-    def __init__(self, **data):
-        # Normalize source, target, and relation before validation
-        if 'source' in data:
-            data['source'] = normalize_name(data['source'])
-        if 'target' in data:
-            data['target'] = normalize_name(data['target'])
-        if 'relation' in data:
-            data['relation'] = normalize_relation(data['relation'])
-        super().__init__(**data)
+    # Normalize source, target, and relation before validation
+    @field_validator('source', 'target', mode='before')
+    @classmethod
+    def _normalize_endpoint(cls, v):
+        return normalize_name(v)
+    
+    @field_validator('relation', mode='before')
+    @classmethod
+    def _normalize_relation(cls, v):
+        return normalize_relation(v)
 
 class KnowledgeGraph(BaseModel):
     entities: List[Entity] = Field(default_factory=list)
     relationships: List[Relationship] = Field(default_factory=list)
 
+# Validator built once at import and reused for every LLM response
+_KG_ADAPTER = TypeAdapter(KnowledgeGraph)
+
 # --- NEO4J INTEGRATION ---
+ENTITY_MERGE_QUERY = """
+UNWIND $rows AS row
+MERGE (e:Entity {name: row.name})
+ON CREATE SET e.type = row.type, e.created = timestamp()
+ON MATCH SET e.type = row.type, e.updated = timestamp()
+RETURN count(e) AS count
+"""
+
+RELATIONSHIP_MERGE_QUERY = """
+UNWIND $rows AS row
+MATCH (source:Entity {name: row.source})
+MATCH (target:Entity {name: row.target})
+MERGE (source)-[r:RELATES {relation: row.relation}]->(target)
+ON CREATE SET r.created = timestamp()
+ON MATCH SET r.updated = timestamp()
+RETURN count(r) AS count
+"""
+
+# Auto-commit variants for large graphs: the server splits the rows into its own batched transactions
+ENTITY_MERGE_IN_TRANSACTIONS_QUERY = f"""
+UNWIND $rows AS row
+CALL {{
+    WITH row
+    MERGE (e:Entity {{name: row.name}})
+    ON CREATE SET e.type = row.type, e.created = timestamp()
+    ON MATCH SET e.type = row.type, e.updated = timestamp()
+}} IN TRANSACTIONS OF {config.NEO4J_TRANSACTION_ROWS} ROWS
+"""
+
+RELATIONSHIP_MERGE_IN_TRANSACTIONS_QUERY = f"""
+UNWIND $rows AS row
+CALL {{
+    WITH row
+    MATCH (source:Entity {{name: row.source}})
+    MATCH (target:Entity {{name: row.target}})
+    MERGE (source)-[r:RELATES {{relation: row.relation}}]->(target)
+    ON CREATE SET r.created = timestamp()
+    ON MATCH SET r.updated = timestamp()
+}} IN TRANSACTIONS OF {config.NEO4J_TRANSACTION_ROWS} ROWS
+"""
+
+def _run_count_query(tx, query, rows):
+    """Transaction function: run a batched write query and return its row count."""
+    return tx.run(query, rows=rows).single()["count"]
+
+def _write_graph(tx, entity_rows, relationship_rows):
+    """Transaction function: merge entities, then relationships, in one commit."""
+    return (_run_count_query(tx, ENTITY_MERGE_QUERY, entity_rows),
+            _run_count_query(tx, RELATIONSHIP_MERGE_QUERY, relationship_rows))
+
+# One driver (and connection pool) per process, shared by Neo4jKnowledgeGraph and get_neo4j_session
+_DRIVER = None
+
+def get_neo4j_driver():
+    """Return the shared Neo4j driver, creating it on first use."""
+    global _DRIVER
+    if _DRIVER is None:
+        neo4j_uri = os.getenv("NEO4J_URI", config.NEO4J_URI)
+        neo4j_username = os.getenv("NEO4J_USERNAME", config.NEO4J_USERNAME)
+        neo4j_password = os.getenv("NEO4J_PASSWORD", config.NEO4J_PASSWORD)
+        
+        _DRIVER = GraphDatabase.driver(
+            neo4j_uri,
+            auth=(neo4j_username, neo4j_password)
+        )
+        atexit.register(_DRIVER.close)
+    return _DRIVER
+
 class Neo4jKnowledgeGraph:
     def __init__(self):
         self.driver = None
@@ -181,29 +305,30 @@ class Neo4jKnowledgeGraph:
     def connect(self):
         """Connect to Neo4j Aura instance."""
         try:
-            neo4j_uri = os.getenv("NEO4J_URI", config.NEO4J_URI)
-            neo4j_username = os.getenv("NEO4J_USERNAME", config.NEO4J_USERNAME)
-            neo4j_password = os.getenv("NEO4J_PASSWORD", config.NEO4J_PASSWORD)
-            
-            self.driver = GraphDatabase.driver(
-                neo4j_uri,
-                auth=(neo4j_username, neo4j_password)
-            )
+            self.driver = get_neo4j_driver()
             
             # Test the connection
             with self.driver.session(database=config.NEO4J_DATABASE) as session:
-                session.run("RETURN 1")
+                session.run("RETURN 1").consume()
             
             logging.info("Successfully connected to Neo4j Aura")
             
         except Exception as e:
             logging.error(f"Failed to connect to Neo4j: {e}")
             self.driver = None
+            return
+        
+        # Unique index on name so MERGE/MATCH on Entity use an index lookup instead of a label scan.
+        # Loading still works without it (e.g. no schema privileges, or duplicate names already stored)
+        try:
+            with self.driver.session(database=config.NEO4J_DATABASE) as session:
+                session.run("CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE").consume()
+        except Exception as e:
+            logging.warning(f"Could not create the Entity name constraint; writes will use label scans: {e}")
     
     def close(self):
-        """Close Neo4j connection."""
-        if self.driver:
-            self.driver.close()
+        """Release the Neo4j connection; the shared driver itself is closed at interpreter exit."""
+        self.driver = None
     
     def clear_graph(self):
         """Clear all nodes and relationships from the knowledge graph."""
@@ -223,56 +348,34 @@ class Neo4jKnowledgeGraph:
             logging.warning("No Neo4j connection available")
             return
         
+        entity_rows = [
+            {"name": entity.name, "type": entity.type}
+            for entity in kg.entities
+            if entity.name and entity.name.strip()
+        ]
+        # Skip relationships with empty names, self-relationships and duplicates before they reach the server
+        relationship_rows = []
+        seen_relationships = set()
+        for rel in kg.relationships:
+            key = (rel.source, rel.target, rel.relation)
+            if (rel.source and rel.target and rel.source.strip() and rel.target.strip()
+                    and rel.source != rel.target and key not in seen_relationships):
+                seen_relationships.add(key)
+                relationship_rows.append({"source": rel.source, "target": rel.target, "relation": rel.relation})
+        
         try:
             with self.driver.session(database=config.NEO4J_DATABASE) as session:
-                # Add entities with merge to prevent duplicates
-                entities_added = 0
-                for entity in kg.entities:
-                    # Skip empty names
-                    if not entity.name or entity.name.strip() == "":
-                        continue
-                    
-                    result = session.run(
-                        """
-                        MERGE (e:Entity {name: $name})
-                        ON CREATE SET e.type = $type, e.created = timestamp()
-                        ON MATCH SET e.type = $type, e.updated = timestamp()
-                        RETURN e.name as name, labels(e) as labels
-                        """,
-                        name=entity.name,
-                        type=entity.type
+                # Rows are sent with UNWIND instead of one round trip per row
+                if len(entity_rows) + len(relationship_rows) <= config.NEO4J_BATCH_SIZE:
+                    # Small graphs commit entities and relationships together in a single transaction
+                    entities_added, relationships_added = session.execute_write(
+                        _write_graph, entity_rows, relationship_rows
                     )
-                    
-                    if result.single():
-                        entities_added += 1
-                
-                # Add relationships with merge to prevent duplicates
-                relationships_added = 0
-                for rel in kg.relationships:
-                    # Skip relationships with empty names
-                    if not rel.source or not rel.target or rel.source.strip() == "" or rel.target.strip() == "":
-                        continue
-                    
-                    # Skip self-relationships
-                    if rel.source == rel.target:
-                        continue
-                    
-                    result = session.run(
-                        """
-                        MATCH (source:Entity {name: $source_name})
-                        MATCH (target:Entity {name: $target_name})
-                        MERGE (source)-[r:RELATES {relation: $relation}]->(target)
-                        ON CREATE SET r.created = timestamp()
-                        ON MATCH SET r.updated = timestamp()
-                        RETURN r.relation as relation
-                        """,
-                        source_name=rel.source,
-                        target_name=rel.target,
-                        relation=rel.relation
-                    )
-                    
-                    if result.single():
-                        relationships_added += 1
+                else:
+                    # CALL { ... } IN TRANSACTIONS must run in an auto-commit transaction
+                    session.run(ENTITY_MERGE_IN_TRANSACTIONS_QUERY, rows=entity_rows).consume()
+                    session.run(RELATIONSHIP_MERGE_IN_TRANSACTIONS_QUERY, rows=relationship_rows).consume()
+                    entities_added, relationships_added = len(entity_rows), len(relationship_rows)
                 
                 logging.info(f"Added/updated {entities_added} entities and {relationships_added} relationships to Neo4j")
                 
@@ -293,12 +396,9 @@ class Neo4jKnowledgeGraph:
             logging.error(f"Error getting Neo4j stats: {e}")
             return {"entities": 0, "relationships": 0}
 
-# --- HELPER FUNCTIONS ---
-async def extract_kg_directly(markdown_content: str) -> KnowledgeGraph:
-    if not markdown_content or not markdown_content.strip():
-        return KnowledgeGraph()
-    
-    prompt = f"""You are an expert knowledge graph extractor specialized in meteorological and oceanographic satellite systems. Analyze the provided MOSDAC website content and extract a technical knowledge graph.
+# --- LLM PROMPTS ---
+# Static instructions are sent as the system message so they stay identical across calls
+KG_EXTRACTION_INSTRUCTIONS = """You are an expert knowledge graph extractor specialized in meteorological and oceanographic satellite systems. Analyze the provided MOSDAC website content and extract a technical knowledge graph.
 
 CONTEXT: MOSDAC (Meteorological and Oceanographic Satellite Data Archival Center) is a data center under ISRO's Space Applications Centre that handles satellite data reception, processing, analysis, and dissemination for earth observation.
 
@@ -317,91 +417,242 @@ PREFERRED RELATIONSHIP TYPES (use these when applicable):
 - observes, detects, collects, stores, transmits, calibrates, validates
 
 REQUIRED JSON STRUCTURE:
-{{
+{
   "entities": [
-    {{"name": "Entity Name", "type": "Entity Type"}},
+    {"name": "Entity Name", "type": "Entity Type"},
     ...
   ],
   "relationships": [
-    {{"source": "Source Entity", "target": "Target Entity", "relation": "specific_technical_relation"}},
+    {"source": "Source Entity", "target": "Target Entity", "relation": "specific_technical_relation"},
     ...
   ]
-}}
+}
 
 EXAMPLE OUTPUT:
-{{
+{
   "entities": [
-    {{"name": "INSAT-3D", "type": "Satellite"}},
-    {{"name": "MOSDAC", "type": "Organization"}},
-    {{"name": "Sea Surface Temperature", "type": "Parameter"}},
-    {{"name": "IMAGER", "type": "Instrument"}}
+    {"name": "INSAT-3D", "type": "Satellite"},
+    {"name": "MOSDAC", "type": "Organization"},
+    {"name": "Sea Surface Temperature", "type": "Parameter"},
+    {"name": "IMAGER", "type": "Instrument"}
   ],
   "relationships": [
-    {{"source": "MOSDAC", "target": "INSAT-3D", "relation": "operates"}},
-    {{"source": "INSAT-3D", "target": "IMAGER", "relation": "carries"}},
-    {{"source": "IMAGER", "target": "Sea Surface Temperature", "relation": "measures"}},
-    {{"source": "MOSDAC", "target": "Sea Surface Temperature", "relation": "processes"}}
+    {"source": "MOSDAC", "target": "INSAT-3D", "relation": "operates"},
+    {"source": "INSAT-3D", "target": "IMAGER", "relation": "carries"},
+    {"source": "IMAGER", "target": "Sea Surface Temperature", "relation": "measures"},
+    {"source": "MOSDAC", "target": "Sea Surface Temperature", "relation": "processes"}
   ]
-}}
+}"""
+
+# Static parts of the per-document user prompt, joined around the page content
+KG_PROMPT_PREFIX = "MARKDOWN CONTENT TO ANALYZE:\n---\n"
+KG_PROMPT_SUFFIX = "\n---\n\nReturn only the JSON object with specific technical relationships:"
 
-MARKDOWN CONTENT TO ANALYZE:
----
-{markdown_content}
----
+# --- HELPER FUNCTIONS ---
+def _estimate_max_tokens(content_chars: int) -> int:
+    """Output token budget sized to the input (~3 chars per token), within the model's output limit."""
+    return min(config.LLM_MAX_OUTPUT_TOKENS, max(1024, content_chars // 3 + 512))
+
+_jittered_backoff = wait_exponential_jitter(initial=2, max=60)
+
+def _wait_for_rate_limit(retry_state):
+    """Wait as long as the provider's Retry-After header asks, else back off exponentially with jitter."""
+    exc = retry_state.outcome.exception()
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "litellm_response_headers", None)
+    if headers:
+        retry_after = headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return min(float(retry_after), 120.0)
+        except (TypeError, ValueError):
+            pass  # Missing, or given as an HTTP date
+    return _jittered_backoff(retry_state)
+
+# Rate-limited calls are retried; jitter keeps concurrent workers from retrying in lockstep
+@retry(
+    retry=retry_if_exception_type(litellm.RateLimitError),
+    stop=stop_after_attempt(config.LLM_MAX_RETRIES),
+    wait=_wait_for_rate_limit,
+    before_sleep=before_sleep_log(logging.getLogger(), logging.WARNING),
+    reraise=True,
+)
+async def _acompletion_with_retry(**kwargs):
+    async with llm_limiter:
+        return await acompletion(**kwargs)
+
+async def _request_kg_json(user_content: str, max_tokens: int = config.LLM_MAX_OUTPUT_TOKENS):
+    """Send document content to the LLM with the extraction instructions and return the raw JSON text (or None)."""
+    llm_api_key = os.getenv("GEMINI_API_KEY")
+    if not llm_api_key:
+        logging.error("GEMINI_API_KEY not found in environment variables.")
+        return None
+
+    response = await _acompletion_with_retry(
+        model="gemini/gemini-2.0-flash", 
+        messages=[
+            {"role": "system", "content": KG_EXTRACTION_INSTRUCTIONS},
+            {"role": "user", "content": user_content}
+        ], 
+        api_key=llm_api_key,
+        temperature=0.1, 
+        max_tokens=max_tokens, 
+        response_format={"type": "json_object"}
+    )
+
+    json_content = response.choices[0].message.content
+    if not json_content or not json_content.strip(): 
+        logging.warning("Empty response from LLM")
+        return None
+
+    # Clean up the JSON content
+    return json_content.strip()
+
+def _parse_llm_json(json_content: str):
+    """Parse JSON returned by the LLM, recovering from stray surrounding text. Returns None on failure."""
+    try:
+        return orjson.loads(json_content)
+    except orjson.JSONDecodeError as e:
+        logging.error(f"JSON parsing failed at line {e.lineno}, column {e.colno}: {e.msg}")
+        logging.error(f"Problematic JSON content (first 500 chars): {json_content[:500]}")
+        
+        # Try to fix common JSON issues
+        try:
+            # Remove any text before the first { or after the last }
+            start_idx = json_content.find('{')
+            end_idx = json_content.rfind('}')
+            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
+                cleaned_json = json_content[start_idx:end_idx+1]
+                parsed_data = orjson.loads(cleaned_json)
+                logging.info("Successfully recovered from JSON parsing error")
+                return parsed_data
+            else:
+                logging.error("Could not find valid JSON boundaries")
+                return None
+        except Exception as recovery_error:
+            logging.error(f"JSON recovery attempt failed: {recovery_error}")
+            return None
+
+def _parse_and_validate(json_content: str):
+    """Parse and validate a single-document LLM response (CPU-bound, run off the event loop). None if unparseable."""
+    parsed_data = _parse_llm_json(json_content)
+    if parsed_data is None:
+        return None
+    return _KG_ADAPTER.validate_python(parsed_data)
+
+def _parse_and_validate_batch(json_content: str, expected: int):
+    """Parse and validate a batched LLM response. Returns None if it does not hold `expected` graphs."""
+    parsed_data = _parse_llm_json(json_content)
+    documents = parsed_data.get("documents") if isinstance(parsed_data, dict) else None
+    if not isinstance(documents, list) or len(documents) != expected:
+        return None
+    return [_KG_ADAPTER.validate_python(doc) for doc in documents]
+
+async def _parse_off_loop(parse, json_content: str, *args):
+    """Run a response parser off the event loop: in a thread for typical responses, so results keep
+    this process's interned names and normalization cache, and in the process pool only for large ones."""
+    if len(json_content) < config.KG_PARSE_PROCESS_MIN_CHARS:
+        return await asyncio.to_thread(parse, json_content, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_process_pool(), parse, json_content, *args)
+
+async def extract_kg_directly(markdown_content: str):
+    """Extract a knowledge graph from one document. Returns None if no valid model response was obtained."""
+    if not markdown_content or not markdown_content.strip():
+        return KnowledgeGraph()
+    
+    if len(markdown_content) > config.LLM_MAX_INPUT_CHARS:
+        logging.warning(f"Clipping {len(markdown_content)}-char document to {config.LLM_MAX_INPUT_CHARS} chars for extraction")
+        markdown_content = markdown_content[:config.LLM_MAX_INPUT_CHARS]
+    
+    prompt = KG_PROMPT_PREFIX + markdown_content + KG_PROMPT_SUFFIX
+    
+    try:
+        json_content = await _request_kg_json(prompt, _estimate_max_tokens(len(markdown_content)))
+        if not json_content:
+            return None
+        
+        return await _parse_off_loop(_parse_and_validate, json_content)
+        
+    except Exception as e:
+        logging.error(f"LLM call failed: {e}", exc_info=True)
+        return None
+
+async def extract_kg_batch(markdown_contents: List[str]) -> list:
+    """Extract one knowledge graph per document using a single LLM request; failed documents are None."""
+    if len(markdown_contents) <= 1:
+        return [await extract_kg_directly(md) for md in markdown_contents]
+    
+    documents_block = "\n\n".join(
+        f"<<<DOC {i}>>>\n{md}\n<<<END {i}>>>" for i, md in enumerate(markdown_contents, 1)
+    )
+    prompt = f"""BATCH INSTRUCTIONS:
+You are given {len(markdown_contents)} separate documents, each wrapped in <<<DOC i>>> ... <<<END i>>> markers.
+Extract a separate knowledge graph for each document using the required JSON structure, and return a single
+JSON object of the form {{"documents": [<graph for DOC 1>, <graph for DOC 2>, ...]}} containing exactly
+{len(markdown_contents)} items in document order.
+
+MARKDOWN DOCUMENTS TO ANALYZE:
+{documents_block}
 
 Return only the JSON object with specific technical relationships:"""
     
     try:
-        llm_api_key = os.getenv("GEMINI_API_KEY")
-        if not llm_api_key:
-            logging.error("GEMINI_API_KEY not found in environment variables.")
-            return KnowledgeGraph()
-            
-        response = await acompletion(
-            model="gemini/gemini-2.0-flash", 
-            messages=[{"role": "user", "content": prompt}], 
-            api_key=llm_api_key,
-            temperature=0.1, 
-            max_tokens=16384, 
-            response_format={"type": "json_object"}
-        )
+        max_tokens = _estimate_max_tokens(sum(len(md) for md in markdown_contents))
+        json_content = await _request_kg_json(prompt, max_tokens)
+        kg_parts = None
+        if json_content:
+            kg_parts = await _parse_off_loop(_parse_and_validate_batch, json_content, len(markdown_contents))
         
-        json_content = response.choices[0].message.content
-        if not json_content or not json_content.strip(): 
-            logging.warning("Empty response from LLM")
-            return KnowledgeGraph()
+        if kg_parts is None:
+            logging.warning("Batch response did not match the number of documents; extracting individually.")
+            return [await extract_kg_directly(md) for md in markdown_contents]
         
-        # Clean up the JSON content
-        json_content = json_content.strip()
+        return kg_parts
         
-        # Try to parse JSON with better error handling
-        try:
-            parsed_data = json.loads(json_content)
-            return KnowledgeGraph.model_validate(parsed_data)
-        except json.JSONDecodeError as e:
-            logging.error(f"JSON parsing failed at line {e.lineno}, column {e.colno}: {e.msg}")
-            logging.error(f"Problematic JSON content (first 500 chars): {json_content[:500]}")
-            
-            # Try to fix common JSON issues
+    except Exception as e:
+        logging.error(f"Batch LLM call failed: {e}", exc_info=True)
+        return [None for _ in markdown_contents]
+
+def load_kg_parts(parts_file: Path) -> dict:
+    """Read per-file KG results appended by an earlier interrupted run: relative path -> (content hash, graph)."""
+    parts = {}
+    if not parts_file.exists():
+        return parts
+    with open(parts_file, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
             try:
-                # Remove any text before the first { or after the last }
-                start_idx = json_content.find('{')
-                end_idx = json_content.rfind('}')
-                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                    cleaned_json = json_content[start_idx:end_idx+1]
-                    parsed_data = json.loads(cleaned_json)
-                    logging.info("Successfully recovered from JSON parsing error")
-                    return KnowledgeGraph.model_validate(parsed_data)
-                else:
-                    logging.error("Could not find valid JSON boundaries")
-                    return KnowledgeGraph()
-            except Exception as recovery_error:
-                logging.error(f"JSON recovery attempt failed: {recovery_error}")
-                return KnowledgeGraph()
-        
+                record = orjson.loads(line)
+                parts[record["file"]] = (record["hash"], _KG_ADAPTER.validate_python(record["kg"]))
+            except Exception as e:
+                # A crash mid-write can leave a truncated last line; that file is simply re-extracted
+                logging.warning(f"Skipping unreadable line in {parts_file.name}: {e}")
+    return parts
+
+def _content_hash(markdown_content: str) -> str:
+    """Key for the extraction cache; unchanged pages map to the same file across runs."""
+    return hashlib.blake2b(markdown_content.encode("utf-8"), digest_size=16).hexdigest()
+
+def _load_cached_kg(content_hash: str):
+    """Return the cached extraction for a content hash, or None on a cache miss."""
+    cache_file = config.KG_CACHE_DIR / f"{content_hash}.json"
+    if not cache_file.exists():
+        return None
+    try:
+        return _KG_ADAPTER.validate_json(cache_file.read_bytes())
     except Exception as e:
-        logging.error(f"LLM call failed: {e}", exc_info=True)
-        return KnowledgeGraph()
+        logging.warning(f"Ignoring unreadable cache file {cache_file.name}: {e}")
+        return None
+
+def _save_cached_kg(content_hash: str, kg: KnowledgeGraph):
+    """Cache a parsed model response, including empty graphs, so unchanged pages are never re-sent to the LLM.
+    
+    Failed extractions (None) are never passed here, so those pages are retried on the next run."""
+    try:
+        config.KG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (config.KG_CACHE_DIR / f"{content_hash}.json").write_bytes(_KG_ADAPTER.dump_json(kg))
+    except Exception as e:
+        logging.warning(f"Failed to write KG cache entry {content_hash}: {e}")
 
 # --- MAIN KG BUILDER FUNCTION ---
 async def build_knowledge_graph():
@@ -425,13 +676,22 @@ async def build_knowledge_graph():
         logging.error("Markdown directory not found. Please run the crawl step first.")
         return
     
-    # Get all saved markdown files
-    md_files = list(config.MARKDOWN_DIR.rglob("*.md"))
+    # Get all saved markdown files, grouped by directory so related pages are read (and batched) together
+    md_files = sorted(config.MARKDOWN_DIR.rglob("*.md"), key=lambda p: (p.parent, p.name))
     if not md_files:
         logging.error("No markdown files found. Please run the crawl step first.")
         return
 
-    final_kg = KnowledgeGraph()
+    # Results of a previous interrupted run are reused for files still on disk with unchanged content;
+    # the log is removed once a run completes
+    kg_parts_file = config.KG_FILE.with_suffix(".jsonl")
+    completed_parts = load_kg_parts(kg_parts_file)
+    if completed_parts:
+        logging.info(f"Resuming: {len(completed_parts)} files were extracted before in {kg_parts_file.name}.")
+
+    # Merged graph, deduplicated incrementally as files complete (dicts keep first-seen order)
+    entity_index = {}  # normalized name -> Entity
+    rel_index = {}  # (source, target, relation) -> Relationship
     logging.info(f"Processing {len(md_files)} markdown files for KG extraction.")
     
     try:
@@ -440,54 +700,118 @@ async def build_knowledge_graph():
         # Clear existing graph in Neo4j
         neo4j_kg.clear_graph()
         
-        for i, md_file in enumerate(md_files):
-            logging.info(f"Processing file ({i+1}/{len(md_files)}): {md_file.relative_to(config.MARKDOWN_DIR)}")
-            
-            try:
-                # Read markdown content from saved file
-                markdown_content = md_file.read_text(encoding="utf-8")
-                
-                if markdown_content and markdown_content.strip():
-                    logging.info(f"  -> Processing markdown content. Length: {len(markdown_content)}")
-                    
-                    kg_part = await extract_kg_directly(markdown_content)
-                    
-                    if kg_part.entities or kg_part.relationships:
-                        # Use normalized names for duplicate checking
-                        existing_entity_names = {e.name for e in final_kg.entities}
-                        new_entities_count = 0
-                        for entity in kg_part.entities:
-                            # Entity names are already normalized in the Entity.__init__ method
-                            if entity.name and entity.name not in existing_entity_names:
-                                final_kg.entities.append(entity)
-                                existing_entity_names.add(entity.name)
-                                new_entities_count += 1
-                        
-                        # Remove duplicate relationships using normalized names
-                        existing_relationships = {(r.source, r.target, r.relation) for r in final_kg.relationships}
-                        new_relationships_count = 0
-                        for rel in kg_part.relationships:
-                            # Relationship names are already normalized in the Relationship.__init__ method
-                            rel_tuple = (rel.source, rel.target, rel.relation)
-                            if rel.source and rel.target and rel_tuple not in existing_relationships:
-                                final_kg.relationships.append(rel)
-                                existing_relationships.add(rel_tuple)
-                                new_relationships_count += 1
-                        
-                        logging.info(f"  -> Extracted {new_entities_count} new entities and {new_relationships_count} new relationships.")
-                    else:
-                        logging.warning("  -> No KG data extracted from this file's content.")
-                else:
+        # Pipeline: a producer reads markdown files into a bounded queue while several
+        # consumers run LLM extraction, so disk reads overlap with in-flight requests.
+        # The LLM rate limit is enforced by llm_limiter inside extract_kg_directly.
+        num_workers = config.LLM_MAX_CONCURRENCY
+        queue = asyncio.Queue(maxsize=2 * num_workers)
+
+        async def producer():
+            batch, batch_chars = [], 0
+            for i, md_file in enumerate(md_files):
+                rel_path = md_file.relative_to(config.MARKDOWN_DIR)
+                logging.info(f"Processing file ({i+1}/{len(md_files)}): {rel_path}")
+                try:
+                    # Read markdown content from saved file off the event loop so in-flight LLM calls keep progressing
+                    markdown_content = await asyncio.to_thread(md_file.read_text, encoding="utf-8")
+                except Exception as e:
+                    logging.error(f"  -> Error reading {md_file}: {e}")
+                    continue
+
+                if not markdown_content or not markdown_content.strip():
                     logging.warning(f"  -> Empty or invalid markdown content in {md_file}")
-                    
-            except Exception as e:
-                logging.error(f"  -> Error processing {md_file}: {e}")
-                continue
+                    continue
+
+                # Pages whose content is unchanged since an earlier run skip the LLM entirely
+                content_hash = _content_hash(markdown_content)
+                completed = completed_parts.get(rel_path.as_posix())
+                if completed is not None and completed[0] == content_hash:
+                    merge(rel_path, completed[1])  # Already in the resume log
+                    continue
+                cached_kg = _load_cached_kg(content_hash)
+                if cached_kg is not None:
+                    logging.info(f"  -> Using cached extraction for {rel_path}")
+                    record_part(rel_path, content_hash, cached_kg)
+                    continue
+
+                # Group small pages so one LLM request covers several of them
+                if batch and batch_chars + len(markdown_content) > config.LLM_BATCH_MAX_CHARS:
+                    await queue.put(batch)
+                    batch, batch_chars = [], 0
+                batch.append((md_file, markdown_content, content_hash))
+                batch_chars += len(markdown_content)
+                if len(batch) >= config.LLM_BATCH_SIZE:
+                    await queue.put(batch)
+                    batch, batch_chars = [], 0
+
+            if batch:
+                await queue.put(batch)
+
+            # One sentinel per consumer
+            for _ in range(num_workers):
+                await queue.put(None)
+
+        def merge(rel_path, kg_part):
+            if not (kg_part.entities or kg_part.relationships):
+                logging.warning(f"  -> No KG data extracted from {rel_path}.")
+                return
 
-            # Add small delay to avoid overwhelming the LLM API
-            if i < len(md_files) - 1:
-                logging.info("Waiting 6 seconds before next file...")
-                await asyncio.sleep(6)
+            # Use normalized names for duplicate checking
+            new_entities_count = 0
+            for entity in kg_part.entities:
+                # Entity names are already normalized by the Entity field validators
+                if entity.name and entity.name not in entity_index:
+                    entity_index[entity.name] = entity
+                    new_entities_count += 1
+
+            # Remove duplicate relationships using normalized names
+            new_relationships_count = 0
+            for rel in kg_part.relationships:
+                # Relationship names are already normalized by the Relationship field validators
+                rel_tuple = (rel.source, rel.target, rel.relation)
+                if rel.source and rel.target and rel_tuple not in rel_index:
+                    rel_index[rel_tuple] = rel
+                    new_relationships_count += 1
+
+            logging.info(f"  -> {rel_path}: extracted {new_entities_count} new entities and {new_relationships_count} new relationships.")
+
+        def record_part(rel_path, content_hash, kg_part):
+            parts_out.write(orjson.dumps({"file": rel_path.as_posix(), "hash": content_hash, "kg": kg_part.model_dump()}) + b"\n")
+            parts_out.flush()
+            merge(rel_path, kg_part)
+
+        async def consumer():
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    break
+                rel_paths = [md_file.relative_to(config.MARKDOWN_DIR) for md_file, _, _ in batch]
+
+                try:
+                    logging.info(f"  -> Extracting from {len(batch)} file(s): {', '.join(str(p) for p in rel_paths)}")
+                    kg_parts = await extract_kg_batch([content for _, content, _ in batch])
+                except Exception as e:
+                    logging.error(f"  -> Error processing {', '.join(str(p) for p in rel_paths)}: {e}")
+                    continue
+
+                # Merging has no await points, so consumers cannot interleave here
+                for (_, _, content_hash), rel_path, kg_part in zip(batch, rel_paths, kg_parts):
+                    if kg_part is None:
+                        logging.warning(f"  -> Extraction failed for {rel_path}; it will be retried on the next run.")
+                        continue
+                    _save_cached_kg(content_hash, kg_part)
+                    record_part(rel_path, content_hash, kg_part)
+
+        # Each file's result is appended as soon as it is extracted, so a crash loses at most the in-flight batches
+        with open(kg_parts_file, "ab") as parts_out:
+            await asyncio.gather(producer(), *[consumer() for _ in range(num_workers)])
+
+        # Materialize the merged graph alongside the per-file results
+        final_kg = KnowledgeGraph(entities=list(entity_index.values()), relationships=list(rel_index.values()))
+        config.KG_FILE.write_bytes(_KG_ADAPTER.dump_json(final_kg, indent=2))
+        logging.info(f"Merged knowledge graph saved to {config.KG_FILE}")
+        # The run completed, so the next one starts from the extraction cache rather than this log
+        kg_parts_file.unlink(missing_ok=True)
 
         # Save to Neo4j only
         neo4j_kg.add_entities_and_relationships(final_kg)
@@ -516,16 +840,7 @@ async def build_knowledge_graph():
 def get_neo4j_session():
     """Get a Neo4j session for querying the knowledge graph."""
     try:
-        neo4j_uri = os.getenv("NEO4J_URI", config.NEO4J_URI)
-        neo4j_username = os.getenv("NEO4J_USERNAME", config.NEO4J_USERNAME)
-        neo4j_password = os.getenv("NEO4J_PASSWORD", config.NEO4J_PASSWORD)
-        
-        driver = GraphDatabase.driver(
-            neo4j_uri,
-            auth=(neo4j_username, neo4j_password)
-        )
-        
-        return driver.session(database=config.NEO4J_DATABASE)
+        return get_neo4j_driver().session(database=config.NEO4J_DATABASE)
     except Exception as e:
         logging.error(f"Failed to create Neo4j session: {e}")
         return None
\ No newline at end of file
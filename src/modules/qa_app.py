@@ -1,20 +1,147 @@
 # src/modules/qa_app.py
 import os
 import logging
-from sentence_transformers import SentenceTransformer
+import functools
+import hashlib
+import queue
+import threading
+import time
+import diskcache
+import httpx
+import litellm
+import numpy as np
+from concurrent.futures import Future
 from pinecone import Pinecone
 from litellm import completion
 from src import config
-from src.modules.gpu_utils import get_device
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; without it the MMR loop runs as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
+from src.modules.gpu_utils import get_device, load_embedding_model, embedding_setup_key
 from src.modules.vector_db_builder import get_pinecone_index
 
+# Static parts of the answer prompt, joined around the retrieved context and the question
+QA_PROMPT_HEAD = """You are a helpful assistant specializing in MOSDAC (Meteorological & Oceanographic Satellite Data Archival Centre) information. 
+
+Based on the context provided from the MOSDAC website, answer the user's question accurately and comprehensively. If the answer isn't fully covered in the context, acknowledge this and provide what information is available.
+
+CONTEXT:
+"""
+QA_PROMPT_QUESTION = "\n\nQUESTION: "
+QA_PROMPT_TAIL = "\n\nANSWER:"
+
+@njit(cache=True, fastmath=True)
+def _mmr(query_vec, doc_vecs, lambda_mult, k):
+    """Maximal marginal relevance: indices of k documents balancing query relevance against
+    similarity to documents already chosen. Vectors are unit-normalized, so dot product = cosine."""
+    n, dim = doc_vecs.shape
+    k = min(k, n)
+    relevance = np.zeros(n, dtype=np.float32)
+    for i in range(n):
+        for d in range(dim):
+            relevance[i] += doc_vecs[i, d] * query_vec[d]
+    
+    max_sim = np.zeros(n, dtype=np.float32)  # Highest similarity to any chosen document
+    chosen = np.zeros(n, dtype=np.bool_)
+    selected = np.empty(k, dtype=np.int64)
+    for step in range(k):
+        best, best_score = -1, -np.inf
+        for i in range(n):
+            if chosen[i]:
+                continue
+            score = lambda_mult * relevance[i] - (1.0 - lambda_mult) * max_sim[i]
+            if score > best_score:
+                best, best_score = i, score
+        selected[step] = best
+        chosen[best] = True
+        for i in range(n):
+            sim = 0.0
+            for d in range(dim):
+                sim += doc_vecs[i, d] * doc_vecs[best, d]
+            if sim > max_sim[i]:
+                max_sim[i] = sim
+    return selected
+
+def _canonical_query(query: str) -> str:
+    """Cache key / encoder input for a question. The embedding model's tokenizer is uncased and
+    ignores extra whitespace, so lowercasing and collapsing whitespace does not change the vector."""
+    return " ".join(query.lower().split())
+
+class QueryEmbedder:
+    """Micro-batches query encodes from concurrent callers into single forward passes.
+    
+    A background thread waits for the first pending query, gathers more for up to
+    QUERY_BATCH_WAIT_MS (or until QUERY_BATCH_MAX_SIZE), encodes them together and
+    resolves each caller's Future."""
+    
+    def __init__(self, model):
+        self.model = model
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+        self._thread.start()
+    
+    def embed(self, text: str):
+        """Return the normalized embedding of `text` as a tuple, blocking until its batch is encoded."""
+        future = Future()
+        self._pending.put((text, future))
+        return future.result()
+    
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + config.QUERY_BATCH_WAIT_MS / 1000
+            while len(batch) < config.QUERY_BATCH_MAX_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(tuple(vector.tolist()))
+
 class RAGPipeline:
     def __init__(self):
         logging.info("Initializing RAG Pipeline with Pinecone...")
         
         # Use GPU if available for embedding model
         device = get_device()
-        self.embedding_model = SentenceTransformer(config.EMBEDDING_MODEL, device=device)
+        self.embedding_model = load_embedding_model(
+            config.EMBEDDING_MODEL, device, backend=config.EMBEDDING_BACKEND,
+            export_dir=config.EMBEDDING_EXPORT_DIR, onnx_file=config.EMBEDDING_ONNX_FILE,
+            fp16=config.QUERY_EMBEDDING_FP16, int8_on_cpu=config.QUERY_EMBEDDING_INT8_CPU
+        )
+        # Per-instance cache so repeated questions skip the transformer forward pass; the disk
+        # cache behind it lets questions from earlier sessions skip it too
+        self._query_cache = diskcache.Cache(str(config.QUERY_EMBEDDING_CACHE_DIR))
+        # Disk cache keys name the whole encoder setup (model, backend, precision, device,
+        # normalization), so switching any of them never serves vectors from another one
+        self._query_cache_prefix = embedding_setup_key(
+            config.EMBEDDING_MODEL, device, backend=config.EMBEDDING_BACKEND, onnx_file=config.EMBEDDING_ONNX_FILE,
+            fp16=config.QUERY_EMBEDDING_FP16, int8_on_cpu=config.QUERY_EMBEDDING_INT8_CPU
+        )
+        # Cache misses from concurrent requests (e.g. Streamlit sessions) share forward passes
+        self._embedder = QueryEmbedder(self.embedding_model)
+        self._encode_cached = functools.lru_cache(maxsize=config.QUERY_EMBEDDING_CACHE_SIZE)(self._encode_query)
+        
+        # Keep-alive HTTP connections for LLM calls, so answers after the first skip the TLS handshake
+        if litellm.client_session is None:
+            litellm.client_session = httpx.Client(
+                timeout=config.QA_LLM_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=20)
+            )
+        self._llm_api_key = os.getenv("GEMINI_API_KEY")
         
         # Connect to Pinecone vector database
         try:
@@ -27,120 +154,184 @@ class RAGPipeline:
             logging.error(f"Failed to connect to Pinecone: {e}")
             raise
     
-    def answer_question(self, query: str, n_results: int = 5):
-        """Answer a question using the RAG pipeline."""
+    def _encode_query(self, canonical_query: str):
+        key = hashlib.sha256(f"{self._query_cache_prefix}\0{canonical_query}".encode("utf-8")).digest()
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+        embedding = self._embedder.embed(canonical_query)
+        self._query_cache.set(key, embedding)
+        return embedding
+    
+    def embed_query(self, query: str):
+        """Return the normalized embedding for a query, reusing it for repeated questions."""
+        return list(self._encode_cached(_canonical_query(query)))
+    
+    def embed_queries(self, queries):
+        """Embed several questions in one forward pass (bypassing the per-question caches)."""
+        vectors = self.embedding_model.encode(
+            [_canonical_query(q) for q in queries], batch_size=32, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return [v.tolist() for v in vectors]
+    
+    def _query_index(self, query_embedding, n_results: int, include_values: bool = False):
+        """Retrieve the nearest chunks for an embedding from Pinecone."""
+        return self.index.query(
+            vector=query_embedding,
+            top_k=n_results,
+            include_metadata=True,
+            include_values=include_values,
+            namespace=config.PINECONE_NAMESPACE
+        )
+    
+    def _retrieve(self, query_embedding, n_results: int, mmr: bool = None):
+        """Retrieve the context chunks for an embedding: the nearest n_results, or with MMR (QA_USE_MMR by
+        default) the MMR_FETCH_K nearest re-ranked for diversity. Returns {"matches": [...]}."""
+        if mmr is None:
+            mmr = config.QA_USE_MMR
+        if not mmr:
+            return self._query_index(query_embedding, n_results)
+        
+        candidates = self._query_index(query_embedding, max(config.MMR_FETCH_K, n_results), include_values=True)['matches']
+        if candidates:
+            doc_vecs = np.array([match['values'] for match in candidates], dtype=np.float32)
+            keep = _mmr(np.asarray(query_embedding, dtype=np.float32), doc_vecs, config.MMR_LAMBDA, n_results)
+            candidates = [candidates[i] for i in keep]
+        return {"matches": candidates}
+    
+    def answer_question(self, query: str, n_results: int = 5, query_embedding=None):
+        """Answer a question using the RAG pipeline. A precomputed `query_embedding` skips the encoder."""
         try:
             # Generate query embedding
-            query_embedding = self.embedding_model.encode(query, normalize_embeddings=True).tolist()
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
             
             # Retrieve relevant documents from Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=n_results,
-                include_metadata=True,
-                namespace=config.PINECONE_NAMESPACE
-            )
+            results = self._retrieve(query_embedding, n_results)
+            return self._answer_from_results(query, results)
             
-            # Debug logging
-            logging.info(f"Pinecone query returned {len(results.get('matches', []))} matches")
-            for i, match in enumerate(results.get('matches', [])):
-                logging.info(f"Match {i+1}: score={match.get('score', 0):.4f}, metadata keys={list(match.get('metadata', {}).keys())}")
-            
-            if not results['matches']:
-                logging.warning("No matches returned from Pinecone")
-                return "I couldn't find any relevant information to answer your question."
-            
-            # Prepare context from retrieved documents
-            context_parts = []
-            sources = []
-            confidence_scores = []
-            
-            for match in results['matches']:
-                metadata = match.get('metadata', {})
-                text = metadata.get('text', '')
-                source = metadata.get('source', f'Document')
-                score = match.get('score', 0.0)
-                
-                logging.info(f"Processing match: score={score:.4f}, text_length={len(text)}, source={source}")
-                
-                if text:
-                    context_parts.append(f"[Source: {source}]\n{text}")
-                    sources.append(source)
-                    confidence_scores.append(score)
-                else:
-                    logging.warning(f"Empty text in match with source: {source}")
-            
-            if not context_parts:
-                logging.warning("No context parts found despite having matches")
-                return "I couldn't find any relevant content to answer your question."
-            
-            logging.info(f"Found {len(context_parts)} context parts for LLM")
-            context = "\n\n---\n\n".join(context_parts)
-            
-            # Generate response using LLM
-            prompt = f"""You are a helpful assistant specializing in MOSDAC (Meteorological & Oceanographic Satellite Data Archival Centre) information. 
-
-Based on the context provided from the MOSDAC website, answer the user's question accurately and comprehensively. If the answer isn't fully covered in the context, acknowledge this and provide what information is available.
-
-CONTEXT:
-{context}
-
-QUESTION: {query}
-
-ANSWER:"""
-
-            response = completion(
-                model=config.LLM_PROVIDER,
-                messages=[{"role": "user", "content": prompt}],
-                api_key=os.getenv("GEMINI_API_KEY"),
-                temperature=0.1,
-                max_tokens=1024
-            )
-            
-            answer = response.choices[0].message.content
+        except Exception as e:
+            logging.error(f"Error in RAG pipeline: {e}")
+            return f"I encountered an error while processing your question: {str(e)}"
+    
+    def answer_question_stream(self, query: str, n_results: int = 5):
+        """Answer a question, streaming the LLM output.
+        
+        Returns the same dict as answer_question, except that "answer" is a generator of text
+        deltas; a plain string is returned when no answer can be generated."""
+        try:
+            query_embedding = self.embed_query(query)
+            results = self._retrieve(query_embedding, n_results)
+            context = self._build_context(query, results)
+            if isinstance(context, str):
+                return context
+            prompt, sources, confidence_scores = context
             
-            # Return structured response with metadata
+            stream = self._complete(prompt, stream=True)
             return {
-                "answer": answer,
+                "answer": (chunk.choices[0].delta.content or "" for chunk in stream),
                 "sources": sources,
                 "confidence_scores": confidence_scores,
-                "context_used": len(context_parts)
+                "context_used": len(sources)
             }
             
         except Exception as e:
             logging.error(f"Error in RAG pipeline: {e}")
             return f"I encountered an error while processing your question: {str(e)}"
     
-    def get_similar_documents(self, query: str, n_results: int = 3):
-        """Get similar documents for a query without generating an answer."""
+    def _answer_from_results(self, query: str, results):
+        """Build the context from Pinecone matches and generate an answer with the LLM."""
+        context = self._build_context(query, results)
+        if isinstance(context, str):
+            return context
+        prompt, sources, confidence_scores = context
+        
+        response = self._complete(prompt)
+        
+        answer = response.choices[0].message.content
+        
+        # Return structured response with metadata
+        return {
+            "answer": answer,
+            "sources": sources,
+            "confidence_scores": confidence_scores,
+            "context_used": len(sources)
+        }
+    
+    def _complete(self, prompt: str, **kwargs):
+        """Send the answer prompt to the LLM, retrying transient failures."""
+        return completion(
+            model=config.LLM_PROVIDER,
+            messages=[{"role": "user", "content": prompt}],
+            api_key=self._llm_api_key,
+            temperature=0.1,
+            max_tokens=1024,
+            num_retries=config.QA_LLM_NUM_RETRIES,
+            timeout=config.QA_LLM_TIMEOUT,
+            **kwargs
+        )
+    
+    def _build_context(self, query: str, results):
+        """Build the LLM prompt from Pinecone matches.
+        
+        Returns (prompt, sources, confidence_scores), or a message string when nothing usable was retrieved."""
+        matches = results.get('matches', [])
+        
+        # Debug logging
+        logging.info(f"Pinecone query returned {len(matches)} matches")
+        
+        if not matches:
+            logging.warning("No matches returned from Pinecone")
+            return "I couldn't find any relevant information to answer your question."
+        
+        # Prepare context from retrieved documents in a single pass over the matches
+        context_parts = []
+        sources = []
+        confidence_scores = []
+        
+        for i, match in enumerate(matches, 1):
+            metadata = match.get('metadata') or {}
+            text = metadata.get('text', '')
+            source = metadata.get('source', f'Document {i}')
+            score = match.get('score', 0.0)
+            
+            logging.info(f"Match {i}: score={score:.4f}, text_length={len(text)}, source={source}")
+            
+            if text:
+                context_parts.append("[Source: " + str(source) + "]\n" + text)
+                sources.append(source)
+                confidence_scores.append(score)
+            else:
+                logging.warning(f"Empty text in match with source: {source}")
+        
+        if not context_parts:
+            logging.warning("No context parts found despite having matches")
+            return "I couldn't find any relevant content to answer your question."
+        
+        logging.info(f"Found {len(context_parts)} context parts for LLM")
+        context = "\n\n---\n\n".join(context_parts)
+        
+        prompt = QA_PROMPT_HEAD + context + QA_PROMPT_QUESTION + query + QA_PROMPT_TAIL
+        return prompt, sources, confidence_scores
+
+    def get_similar_documents(self, query: str, n_results: int = 3, mmr: bool = None):
+        """Get similar documents for a query without generating an answer.
+        
+        Retrieval follows _retrieve; mmr=True/False overrides QA_USE_MMR."""
         try:
-            query_embedding = self.embedding_model.encode(query, normalize_embeddings=True).tolist()
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=n_results,
-                include_metadata=True,
-                namespace=config.PINECONE_NAMESPACE
-            )
+            query_embedding = self.embed_query(query)
+            matches = self._retrieve(query_embedding, n_results, mmr=mmr)['matches']
             
             # Format results to match the old ChromaDB format for compatibility
-            formatted_results = {
-                'documents': [[]],
-                'metadatas': [[]],
-                'distances': [[]]
-            }
+            metadatas = [match.get('metadata', {}) for match in matches]
+            # Convert similarity scores to distances (lower is more similar) in one pass
+            scores = np.fromiter((match.get('score', 0.0) for match in matches), dtype=np.float64, count=len(matches))
             
-            for match in results['matches']:
-                metadata = match.get('metadata', {})
-                text = metadata.get('text', '')
-                source = metadata.get('source', 'Unknown')
-                # Convert similarity score to distance (lower is more similar)
-                distance = 1.0 - match.get('score', 0.0)
-                
-                formatted_results['documents'][0].append(text)
-                formatted_results['metadatas'][0].append({'source': source})
-                formatted_results['distances'][0].append(distance)
-            
-            return formatted_results
+            return {
+                'documents': [[metadata.get('text', '') for metadata in metadatas]],
+                'metadatas': [[{'source': metadata.get('source', 'Unknown')} for metadata in metadatas]],
+                'distances': [(1.0 - scores).tolist()]
+            }
             
         except Exception as e:
             logging.error(f"Error retrieving similar documents: {e}")
@@ -191,10 +382,14 @@ def start_qa_session():
                 continue
             
             print("\n🔍 Searching knowledge base...")
-            result = rag_system.answer_question(question)
+            result = rag_system.answer_question_stream(question)
             
             if isinstance(result, dict):
-                print(f"\n✅ Answer: {result['answer']}")
+                # Print tokens as the LLM generates them
+                print("\n✅ Answer: ", end="", flush=True)
+                for delta in result['answer']:
+                    print(delta, end="", flush=True)
+                print()
                 print(f"\n📊 Sources used: {', '.join(result['sources'][:3])}")
                 print(f"📈 Retrieved {result['context_used']} relevant documents")
                 if result['confidence_scores']:
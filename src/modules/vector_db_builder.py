@@ -1,15 +1,21 @@
 # src/modules/vector_db_builder.py
 import os
+import functools
+import hashlib
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import numpy as np
 import torch
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+from torch.utils.data import DataLoader
+from tokenizers import Tokenizer
 import pinecone
 from pinecone import Pinecone, ServerlessSpec
 import pypdf
 import docx
 from src import config
-from src.modules.gpu_utils import get_device, optimize_gpu_settings, get_recommended_batch_size
+from src.modules.gpu_utils import get_device, optimize_gpu_settings, get_recommended_batch_size, load_embedding_model, compile_embedding_model, embedding_setup_key
 
 def read_text_from_file(file_path):
     ext = file_path.suffix.lower()
@@ -21,6 +27,113 @@ def read_text_from_file(file_path):
         logging.error(f"Error reading {file_path}: {e}")
     return ""
 
+def _embedding_cache_key(setup_key, text):
+    """Cache key for a chunk's embedding; includes the encoder setup (embedding_setup_key) so switching
+    model, backend, export or precision never reuses vectors from another setup."""
+    return hashlib.sha256(f"{setup_key}\0{text}".encode("utf-8")).digest()
+
+def _upsert_chunks(index, batch_chunks, batch_embeddings, in_flight):
+    """Start async uploads of one batch of chunks to the Pinecone namespace.
+    
+    Requests are split into PINECONE_UPSERT_BATCH_SIZE vectors; at most PINECONE_MAX_IN_FLIGHT
+    stay pending in `in_flight`, so encoding continues while earlier uploads are on the wire."""
+    for start in range(0, len(batch_chunks), config.PINECONE_UPSERT_BATCH_SIZE):
+        end = start + config.PINECONE_UPSERT_BATCH_SIZE
+        # One tolist() over the (rows, dim) block instead of one per vector
+        values = np.asarray(batch_embeddings[start:end], dtype=np.float32).tolist()
+        vectors_to_upsert = []
+        for chunk, embedding in zip(batch_chunks[start:end], values):
+            vectors_to_upsert.append({
+                "id": chunk["id"],
+                "values": embedding,
+                "metadata": {
+                    "text": chunk["text"],
+                    "source": chunk["source"]
+                }
+            })
+        while len(in_flight) >= config.PINECONE_MAX_IN_FLIGHT:
+            in_flight.popleft().get()
+        in_flight.append(index.upsert(vectors=vectors_to_upsert, namespace=config.PINECONE_NAMESPACE, async_req=True))
+
+def split_documents(docs, chunk_tokens=config.CHUNK_TOKENS, overlap_tokens=config.CHUNK_OVERLAP_TOKENS):
+    """Split documents into overlapping windows of the embedding model's tokens.
+    
+    All documents are tokenized in one batched call to the Rust tokenizer; each window is sliced
+    back out of the original text through the token offsets, so chunks keep their exact wording."""
+    tokenizer = Tokenizer.from_pretrained(config.EMBEDDING_MODEL)
+    tokenizer.no_truncation()
+    encodings = tokenizer.encode_batch([doc["content"] for doc in docs], add_special_tokens=False)
+    
+    step = chunk_tokens - overlap_tokens
+    chunks = []
+    for doc, encoding in zip(docs, encodings):
+        offsets = encoding.offsets
+        for i, start in enumerate(range(0, max(len(offsets) - overlap_tokens, 1), step)):
+            window = offsets[start:start + chunk_tokens]
+            if not window:
+                break
+            chunks.append({
+                "source": doc["source"],
+                "id": f"{os.path.basename(doc['source'])}_{i}",
+                "text": doc["content"][window[0][0]:window[-1][1]]
+            })
+    return chunks
+
+def _pad_batch(tokenizer, features):
+    """DataLoader collate function: pad one batch of pre-tokenized chunks to its longest member, rounded up
+    to a multiple of EMBEDDING_PAD_MULTIPLE so the compiled encoder only ever sees a few sequence lengths."""
+    return tokenizer.pad(features, padding=True, pad_to_multiple_of=config.EMBEDDING_PAD_MULTIPLE, return_tensors="pt")
+
+def _encode_batches(model, texts, batch_size, device):
+    """Encode texts into one preallocated float32 array, yielding (start, end, rows) as each batch lands.
+    
+    All texts are tokenized once up front, so the DataLoader only pads each batch to its own
+    longest sequence (in EMBEDDING_PAD_MULTIPLE steps); on CUDA each batch is copied into a pinned
+    host buffer asynchronously while the next forward pass runs."""
+    on_cuda = device.type == "cuda"
+    host = torch.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=torch.float32, pin_memory=on_cuda)
+    out = host.numpy()
+    
+    encoded = model.tokenizer(texts, padding=False, truncation=True, max_length=model.max_seq_length)
+    features = [dict(zip(encoded.keys(), values)) for values in zip(*encoded.values())]
+    
+    # Padding is cheap, so it runs in this process: no worker processes forked after CUDA init
+    # (or from the Streamlit background thread)
+    loader = DataLoader(
+        features,
+        batch_size=batch_size,
+        collate_fn=functools.partial(_pad_batch, model.tokenizer),
+        num_workers=0,
+        pin_memory=on_cuda,
+    )
+    start, pending = 0, None
+    for batch in loader:
+        batch = {k: v.to(device, non_blocking=True) for k, v in batch.items()}
+        with torch.inference_mode():
+            embeddings = model(batch)["sentence_embedding"]
+            # L2 normalization for better similarity search
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        end = start + embeddings.shape[0]
+        host[start:end].copy_(embeddings.float(), non_blocking=on_cuda)
+        copied = None
+        if on_cuda:
+            copied = torch.cuda.Event()
+            copied.record()
+        
+        # Hand out the previous batch once its copy has finished; this one is still in flight
+        if pending:
+            yield _finish_batch(out, *pending)
+        pending = (start, end, copied)
+        start = end
+    
+    if pending:
+        yield _finish_batch(out, *pending)
+
+def _finish_batch(out, start, end, copied):
+    if copied is not None:
+        copied.synchronize()
+    return start, end, out[start:end]
+
 def build_vector_database():
     """Creates embeddings and stores them in Pinecone with GPU acceleration."""
     logging.info("Starting vector database construction with Pinecone.")
@@ -46,36 +159,30 @@ def build_vector_database():
             dimension=config.PINECONE_DIMENSION,
             metric=config.PINECONE_METRIC,
             spec=ServerlessSpec(
-                cloud='aws',
-                region='us-east-1'  # Change to your preferred region
+                cloud=config.PINECONE_CLOUD,
+                region=config.PINECONE_REGION
             )
         )
     else:
         logging.info(f"Using existing Pinecone index: {config.PINECONE_INDEX_NAME}")
     
     # Connect to the index
-    index = pc.Index(config.PINECONE_INDEX_NAME)
+    index = pc.Index(config.PINECONE_INDEX_NAME, pool_threads=config.PINECONE_POOL_THREADS)
+    in_flight = deque()  # Pending async upsert requests
     
-    # Read and process documents
+    # Read and process documents; reads are I/O-bound, so a thread pool overlaps them
+    files = list(config.MARKDOWN_DIR.rglob("*.md"))
+    with ThreadPoolExecutor(max_workers=min(32, len(files) or 1)) as executor:
+        contents = list(executor.map(read_text_from_file, files))
     all_docs = []
-    for f in config.MARKDOWN_DIR.rglob("*.md"):
-        content = read_text_from_file(f)
+    for f, content in zip(files, contents):
         if content: all_docs.append({"source": str(f.relative_to(config.ROOT_DIR)), "content": content})
     
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = []
-    for doc in all_docs:
-        doc_chunks = text_splitter.split_text(doc["content"])
-        for i, chunk_text in enumerate(doc_chunks):
-            chunks.append({
-                "source": doc["source"], 
-                "id": f"{os.path.basename(doc['source'])}_{i}", 
-                "text": chunk_text
-            })
+    chunks = split_documents(all_docs)
     
-    # Initialize SentenceTransformer with GPU support
-    logging.info(f"Loading embedding model '{config.EMBEDDING_MODEL}' on {device}")
-    model = SentenceTransformer(config.EMBEDDING_MODEL, device=device)
+    # Encode chunks in length order so each batch pads to a similar length; ids travel with
+    # each chunk, so the upsert needs no reordering
+    chunks.sort(key=lambda c: len(c["text"]))
     
     logging.info(f"Creating embeddings for {len(chunks)} chunks using {device}...")
     
@@ -83,43 +190,56 @@ def build_vector_database():
     batch_size = get_recommended_batch_size()
     logging.info(f"Using batch size: {batch_size}")
     
-    # Process chunks in batches and upload to Pinecone
-    for i in range(0, len(chunks), batch_size):
-        batch_chunks = chunks[i:i+batch_size]
-        batch_texts = [c['text'] for c in batch_chunks]
-        
-        # Generate embeddings
-        batch_embeddings = model.encode(
-            batch_texts, 
-            show_progress_bar=True,
-            batch_size=batch_size,
-            convert_to_tensor=True,  # Keep tensors on GPU until the end
-            normalize_embeddings=True  # L2 normalization for better similarity search
+    # Chunks whose text was embedded by an earlier run are uploaded straight from the cache
+    emb_cache = diskcache.Cache(str(config.EMBEDDING_CACHE_DIR))
+    setup_key = embedding_setup_key(
+        config.EMBEDDING_MODEL, device, backend=config.EMBEDDING_BACKEND, onnx_file=config.EMBEDDING_ONNX_FILE
+    )
+    cached_chunks, cached_embeddings, todo = [], [], []
+    for chunk in chunks:
+        key = _embedding_cache_key(setup_key, chunk["text"])
+        cached = emb_cache.get(key)
+        if cached is None:
+            todo.append((chunk, key))
+        else:
+            cached_chunks.append(chunk)
+            cached_embeddings.append(np.frombuffer(cached, dtype=np.float32))
+    logging.info(f"{len(cached_chunks)} chunks found in embedding cache; {len(todo)} to encode")
+    
+    for i in range(0, len(cached_chunks), batch_size):
+        _upsert_chunks(index, cached_chunks[i:i+batch_size], cached_embeddings[i:i+batch_size], in_flight)
+    
+    # The model is only needed (and loaded) when some chunks are not cached
+    if todo:
+        # Initialize SentenceTransformer with GPU support
+        logging.info(f"Loading embedding model '{config.EMBEDDING_MODEL}' on {device}")
+        # Half precision on CUDA runs the matmuls on tensor cores and halves activation memory;
+        # EMBEDDING_BACKEND=onnx/openvino switches to an exported graph for CPU-bound machines
+        model = load_embedding_model(
+            config.EMBEDDING_MODEL, device, backend=config.EMBEDDING_BACKEND,
+            export_dir=config.EMBEDDING_EXPORT_DIR, onnx_file=config.EMBEDDING_ONNX_FILE
         )
+        if config.EMBEDDING_COMPILE and config.EMBEDDING_BACKEND == "torch":
+            model = compile_embedding_model(model, device)
+    
+    # Process remaining chunks in batches and upload to Pinecone; each batch's device-to-host
+    # copy overlaps the next forward pass
+    todo_texts = [chunk["text"] for chunk, _ in todo]
+    for i, end, batch_embeddings in (_encode_batches(model, todo_texts, batch_size, device) if todo else []):
+        batch_chunks = [chunk for chunk, _ in todo[i:end]]
         
-        # Convert to CPU numpy arrays for upload
-        if isinstance(batch_embeddings, torch.Tensor):
-            batch_embeddings = batch_embeddings.cpu().numpy()
-        
-        # Prepare vectors for Pinecone
-        vectors_to_upsert = []
-        for j, (chunk, embedding) in enumerate(zip(batch_chunks, batch_embeddings)):
-            vectors_to_upsert.append({
-                "id": chunk["id"],
-                "values": embedding.tolist() if hasattr(embedding, 'tolist') else embedding,
-                "metadata": {
-                    "text": chunk["text"],
-                    "source": chunk["source"]
-                }
-            })
+        for (_, key), embedding in zip(todo[i:end], batch_embeddings):
+            emb_cache.set(key, embedding.tobytes())
         
         # Upsert to Pinecone with namespace
-        index.upsert(vectors=vectors_to_upsert, namespace=config.PINECONE_NAMESPACE)
-        logging.info(f"Uploaded batch {i//batch_size + 1}/{(len(chunks)-1)//batch_size + 1} to Pinecone namespace '{config.PINECONE_NAMESPACE}'")
-        
-        # Clear GPU cache periodically to prevent memory issues
-        if device.type == "cuda" and i % (batch_size * 10) == 0:
-            torch.cuda.empty_cache()
+        _upsert_chunks(index, batch_chunks, batch_embeddings, in_flight)
+        logging.info(f"Queued batch {i//batch_size + 1}/{(len(todo)-1)//batch_size + 1} to Pinecone namespace '{config.PINECONE_NAMESPACE}'")
+    
+    emb_cache.close()
+    
+    # Wait for the remaining uploads before reading index stats
+    while in_flight:
+        in_flight.popleft().get()
     
     # Final GPU memory cleanup
     if device.type == "cuda":
@@ -132,11 +252,17 @@ def build_vector_database():
     logging.info(f"Total vectors: {stats['total_vector_count']}")
     logging.info(f"Embedding generation completed using {device}")
 
+@functools.lru_cache(maxsize=1)
 def get_pinecone_index():
-    """Get Pinecone index for querying."""
+    """Get Pinecone index for querying; the client and index handle are shared per process."""
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
     if not pinecone_api_key:
         raise ValueError("PINECONE_API_KEY not found in environment variables.")
     
     pc = Pinecone(api_key=pinecone_api_key)
-    return pc.Index(config.PINECONE_INDEX_NAME)
\ No newline at end of file
+    return pc.Index(config.PINECONE_INDEX_NAME)
+
+def get_namespace_vector_count(index=None):
+    """Number of vectors in the configured Pinecone namespace (one describe_index_stats call)."""
+    stats = (index or get_pinecone_index()).describe_index_stats()
+    return stats.get('namespaces', {}).get(config.PINECONE_NAMESPACE, {}).get('vector_count', 0)
\ No newline at end of file
@@ -7,8 +7,6 @@ import shutil
 from dotenv import load_dotenv
 
 from src import config
-from src.modules import crawler, kg_builder, vector_db_builder, qa_app
-from src.modules.kg_builder import get_neo4j_session
 
 def setup_logging():
     config.OUTPUT_DIR.mkdir(exist_ok=True)
@@ -18,6 +16,7 @@ def setup_logging():
 def check_neo4j_has_entities():
     """Check if Neo4j has any entities."""
     try:
+        from src.modules.kg_builder import get_neo4j_session
         session = get_neo4j_session()
         if session:
             result = session.run("MATCH (n:Entity) RETURN count(n) as count").single()
@@ -29,6 +28,7 @@ def check_neo4j_has_entities():
 def clear_neo4j_graph():
     """Clear all entities and relationships from Neo4j."""
     try:
+        from src.modules.kg_builder import get_neo4j_session
         session = get_neo4j_session()
         if session:
             session.run("MATCH (n) DETACH DELETE n")
@@ -42,15 +42,8 @@ def check_pinecone_has_vectors():
     try:
         if not os.getenv("PINECONE_API_KEY"):
             return False
-        from src.modules.vector_db_builder import get_pinecone_index
-        from src import config
-        index = get_pinecone_index()
-        stats = index.describe_index_stats()
-        
-        # Check the specific namespace
-        namespace_stats = stats.get('namespaces', {}).get(config.PINECONE_NAMESPACE, {})
-        vector_count = namespace_stats.get('vector_count', 0)
-        return vector_count > 0
+        from src.modules.vector_db_builder import get_namespace_vector_count
+        return get_namespace_vector_count() > 0
     except:
         return False
 
@@ -65,34 +58,48 @@ def clear_pinecone_index():
         logging.error(f"Error accessing Pinecone index: {e}")
 
 async def main():
-    load_dotenv()
-    setup_logging()
-
+    # Parse arguments first so --help exits before logging is set up
     parser = argparse.ArgumentParser(description="Run the MOSDAC RAG Pipeline.")
     parser.add_argument("--step", required=True, choices=['crawl', 'kg', 'vectordb', 'qa', 'all'],
                         help="The pipeline step to run.")
     parser.add_argument("--force", action='store_true', help="Force re-running a step even if output exists.")
     args = parser.parse_args()
 
+    load_dotenv()
+    setup_logging()
+
+    # Heavy modules (crawl4ai, litellm, torch, sentence-transformers) are imported
+    # only for the steps that need them
     if args.step == 'crawl' or args.step == 'all':
+        from src.modules import crawler
         if args.force and config.MARKDOWN_DIR.exists():
             logging.info("Force flag set. Deleting existing markdown directory.")
             shutil.rmtree(config.MARKDOWN_DIR)
+            config.DOC_INDEX_FILE.unlink(missing_ok=True)
         if not config.MARKDOWN_DIR.exists() or not any(config.MARKDOWN_DIR.iterdir()):
             await crawler.run_crawl()
         else:
             logging.info("Markdown directory already exists. Skipping crawl. Use --force to re-run.")
 
     if args.step == 'kg' or args.step == 'all':
+        from src.modules import kg_builder
         if args.force and check_neo4j_has_entities():
             logging.info("Force flag set. Clearing existing Neo4j knowledge graph.")
             clear_neo4j_graph()
+        kg_parts_file = config.KG_FILE.with_suffix(".jsonl")
+        if args.force and kg_parts_file.exists():
+            logging.info("Force flag set. Deleting saved per-file KG extraction results.")
+            kg_parts_file.unlink()
+        if args.force and config.KG_CACHE_DIR.exists():
+            logging.info("Force flag set. Deleting cached KG extraction results.")
+            shutil.rmtree(config.KG_CACHE_DIR)
         if not check_neo4j_has_entities():
             await kg_builder.build_knowledge_graph()
         else:
             logging.info("Neo4j knowledge graph already exists. Skipping build. Use --force to re-run.")
 
     if args.step == 'vectordb' or args.step == 'all':
+        from src.modules import vector_db_builder
         if args.force and check_pinecone_has_vectors():
             logging.info("Force flag set. Will rebuild Pinecone index.")
             clear_pinecone_index()
@@ -102,6 +109,7 @@ async def main():
             logging.info("Pinecone vector database already exists. Skipping build. Use --force to re-run.")
 
     if args.step == 'qa' or args.step == 'all':
+        from src.modules import qa_app
         qa_app.start_qa_session()
 
 if __name__ == "__main__":
@@ -11,15 +11,20 @@ import sys
 import json
 import asyncio
 import logging
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from pathlib import Path
 import time
 from datetime import datetime
 import networkx as nx
 from pyvis.network import Network
-import tempfile
+import sqlite3
+import threading
+import uuid
+import bisect
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -30,10 +35,14 @@ try:
     from src.modules import crawler, kg_builder, vector_db_builder
     from src.modules.gpu_utils import check_gpu_setup, get_device
     from src.modules.kg_builder import get_neo4j_session
+    from src.modules.io_utils import rebuild_doc_index, kg_counts
 except ImportError as e:
     st.error(f"Import error: {e}")
     st.stop()
 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from neo4j.exceptions import ClientError
+
 # Page configuration
 st.set_page_config(
     page_title="MOSDAC RAG System",
@@ -42,6 +51,124 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_data(ttl=30)
+def _list_md_files(md_dir_str, mtime):
+    """List crawled markdown files; keyed on the directory mtime so reruns skip the walk."""
+    return list(Path(md_dir_str).rglob("*.md"))
+
+def list_markdown_files():
+    """Cached list of markdown files in MARKDOWN_DIR (empty if the crawl has not run)."""
+    if not config.MARKDOWN_DIR.exists():
+        return []
+    return _list_md_files(str(config.MARKDOWN_DIR), config.MARKDOWN_DIR.stat().st_mtime)
+
+# The cached connection is shared by every session's script thread; sqlite3 connections must not
+# run statements concurrently, so each query holds this lock
+_DOC_INDEX_READ_LOCK = threading.Lock()
+
+@st.cache_resource
+def _doc_index_connection():
+    """Read-only connection to the crawl's document index, built from the files on disk if missing.
+    
+    Query it only while holding _DOC_INDEX_READ_LOCK."""
+    if not config.DOC_INDEX_FILE.exists():
+        rebuild_doc_index()
+    return sqlite3.connect(f"file:{config.DOC_INDEX_FILE.as_posix()}?mode=ro", uri=True, check_same_thread=False)
+
+@st.cache_data(ttl=300, show_spinner=False)
+def list_document_names():
+    """Sorted markdown paths (relative to MARKDOWN_DIR) from the document index, falling back to a directory walk.
+    
+    Cached for 5 minutes; a finished pipeline step clears it."""
+    try:
+        conn = _doc_index_connection()
+        with _DOC_INDEX_READ_LOCK:
+            rows = conn.execute("SELECT path FROM docs ORDER BY path").fetchall()
+    except (sqlite3.Error, OSError):
+        rows = []
+    if rows:
+        return [row[0] for row in rows]
+    return sorted(str(f.relative_to(config.MARKDOWN_DIR)) for f in list_markdown_files())
+
+def _has_markdown(root):
+    """True as soon as one .md file is found under root (depth-first scandir, stops at the first hit)."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.md'):
+                        return True
+        except OSError:
+            continue
+    return False
+
+@st.cache_data(ttl=15)
+def _status_snapshot():
+    """Filesystem state used by the pipeline status, gathered with a handful of syscalls."""
+    return {
+        "has_markdown": _has_markdown(str(config.MARKDOWN_DIR)),
+        "has_kg_file": config.KG_FILE.is_file()
+    }
+
+# Lookup table marking ASCII whitespace bytes (\t \n \v \f \r and space)
+_WHITESPACE_BYTES = np.zeros(256, dtype=bool)
+_WHITESPACE_BYTES[[9, 10, 11, 12, 13, 32]] = True
+
+@st.cache_data(ttl=30)
+def _kg_summary(path_str, mtime):
+    """(entities, relationships) counted from the KG JSON file, once per file version."""
+    return kg_counts(path_str)
+
+def kg_summary():
+    """Counts from the local KG file, or None if the KG step has not written one."""
+    if not _status_snapshot()["has_kg_file"]:
+        return None
+    try:
+        return _kg_summary(str(config.KG_FILE), config.KG_FILE.stat().st_mtime)
+    except Exception:
+        return None
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _kg_file_bytes(path_str, mtime):
+    """Contents of the KG JSON file, read once per file version and shared without copying."""
+    return Path(path_str).read_bytes()
+
+def kg_file_bytes():
+    """Bytes of the local KG file for download, or None if the KG step has not written one."""
+    try:
+        return _kg_file_bytes(str(config.KG_FILE), config.KG_FILE.stat().st_mtime)
+    except OSError:
+        return None
+
+@st.cache_data(max_entries=32)
+def _read_md(path_str, mtime, size):
+    """Read a markdown file and compute its stats once per file version (path, mtime, size)."""
+    raw = Path(path_str).read_bytes()
+    content = raw.decode("utf-8")
+    
+    # Line and word counts in one vectorized sweep over the bytes; a word starts wherever
+    # a non-whitespace byte follows whitespace (or the start of the file)
+    data = np.frombuffer(raw, dtype=np.uint8)
+    space = _WHITESPACE_BYTES[data]
+    words = int(np.count_nonzero(space[:-1] & ~space[1:])) + int(data.size > 0 and not space[0])
+    stats = {
+        "characters": len(content),
+        "lines": int(np.count_nonzero(data == 0x0A)) + 1,
+        "words": words,
+        "size_kb": size / 1024
+    }
+    return content, stats
+
+DOC_PREVIEW_CHARS = 100_000  # Larger documents render only this many characters unless expanded
+
+@st.cache_data(ttl=30)
+def get_pinecone_vector_count():
+    """Vector count of the Pinecone namespace, cached for 30s across reruns."""
+    return vector_db_builder.get_namespace_vector_count()
+
 # Initialize session state for connection status
 def init_connection_state():
     """Initialize connection status in session state."""
@@ -49,7 +176,7 @@ def init_connection_state():
         st.session_state.connection_status = {
             'pinecone': {'checked': False, 'connected': False, 'last_check': None, 'error': None},
             'neo4j': {'checked': False, 'connected': False, 'last_check': None, 'error': None},
-            'rag_system': {'initialized': False, 'instance': None, 'error': None}
+            'rag_system': {'initialized': False, 'error': None}
         }
 
 def check_pinecone_connection_cached():
@@ -70,19 +197,14 @@ def check_pinecone_connection_cached():
                 'last_check': time.time(), 'error': 'API key not found'
             })
             return False
-            
-        from src.modules.vector_db_builder import get_pinecone_index
-        index = get_pinecone_index()
-        stats = index.describe_index_stats()
         
-        # Check the specific namespace
-        namespace_stats = stats.get('namespaces', {}).get(config.PINECONE_NAMESPACE, {})
-        vector_count = namespace_stats.get('vector_count', 0)
+        # Check the specific namespace; the count is kept for the overview metric
+        vector_count = get_pinecone_vector_count()
         is_connected = vector_count > 0
         
         conn_state.update({
             'checked': True, 'connected': is_connected,
-            'last_check': time.time(), 'error': None
+            'last_check': time.time(), 'error': None, 'vector_count': vector_count
         })
         return is_connected
         
@@ -93,6 +215,12 @@ def check_pinecone_connection_cached():
         })
         return False
 
+NEO4J_COUNTS_QUERY = """
+CALL { MATCH (n:Entity) RETURN count(n) AS entities }
+CALL { MATCH ()-[r:RELATES]->() RETURN count(r) AS relationships }
+RETURN entities, relationships
+"""
+
 def check_neo4j_connection_cached():
     """Check Neo4j connection with caching."""
     conn_state = st.session_state.connection_status['neo4j']
@@ -107,13 +235,15 @@ def check_neo4j_connection_cached():
     try:
         session = get_neo4j_session()
         if session:
-            result = session.run("MATCH (n:Entity) RETURN count(n) as count").single()
+            # The check fetches both counts, so the overview stats need no further query
+            record = session.run(NEO4J_COUNTS_QUERY).single()
             session.close()
-            is_connected = result["count"] > 0
+            is_connected = record["entities"] > 0
             
             conn_state.update({
                 'checked': True, 'connected': is_connected,
-                'last_check': time.time(), 'error': None
+                'last_check': time.time(), 'error': None,
+                'stats': {"entities": record["entities"], "relationships": record["relationships"]}
             })
             return is_connected
         else:
@@ -130,55 +260,40 @@ def check_neo4j_connection_cached():
         })
         return False
 
+@st.cache_resource(show_spinner="Loading RAG pipeline...")
+def get_rag_pipeline():
+    """One RAGPipeline (embedding model + Pinecone handle) shared by every session."""
+    return RAGPipeline()
+
 def get_rag_system_cached():
-    """Get RAG system instance with caching."""
+    """Get the shared RAG system; session state only records the outcome for status display."""
     rag_state = st.session_state.connection_status['rag_system']
-    
-    # Return cached instance if available
-    if rag_state['initialized'] and rag_state['instance']:
-        return rag_state['instance']
-    
-    # Initialize RAG system
     try:
-        rag_system = RAGPipeline()
-        rag_state.update({
-            'initialized': True, 'instance': rag_system, 'error': None
-        })
+        rag_system = get_rag_pipeline()
+        rag_state.update({'initialized': True, 'error': None})
         return rag_system
-        
     except Exception as e:
-        rag_state.update({
-            'initialized': False, 'instance': None, 'error': str(e)
-        })
+        rag_state.update({'initialized': False, 'error': str(e)})
         return None
 
 def refresh_connection_status():
     """Force refresh of all connection statuses."""
+    get_pinecone_vector_count.clear()
+    clear_kg_caches()
     st.session_state.connection_status = {
         'pinecone': {'checked': False, 'connected': False, 'last_check': None, 'error': None},
         'neo4j': {'checked': False, 'connected': False, 'last_check': None, 'error': None},
-        'rag_system': {'initialized': False, 'instance': None, 'error': None}
+        'rag_system': {'initialized': False, 'error': None}
     }
-    # Force recheck
-    check_pinecone_connection_cached()
-    check_neo4j_connection_cached()
+    # Force recheck; the two probes are independent network round trips
+    run_concurrently(check_pinecone_connection_cached, check_neo4j_connection_cached)
 
 def get_neo4j_stats_cached():
     """Get Neo4j knowledge graph statistics with caching."""
-    # Only get stats if connection is already established
+    # Only get stats if connection is already established; the check stored them
     if not check_neo4j_connection_cached():
         return {"entities": 0, "relationships": 0}
-    
-    try:
-        session = get_neo4j_session()
-        if session:
-            entity_count = session.run("MATCH (n:Entity) RETURN count(n) as count").single()["count"]
-            rel_count = session.run("MATCH ()-[r:RELATES]->() RETURN count(r) as count").single()["count"]
-            session.close()
-            return {"entities": entity_count, "relationships": rel_count}
-    except Exception as e:
-        st.error(f"Error getting Neo4j stats: {e}")
-    return {"entities": 0, "relationships": 0}
+    return st.session_state.connection_status['neo4j'].get('stats') or {"entities": 0, "relationships": 0}
 
 # Custom CSS for better styling
 st.markdown("""
@@ -256,21 +371,40 @@ def display_header():
     </div>
     """, unsafe_allow_html=True)
 
+def run_concurrently(*probes):
+    """Run blocking probes (filesystem, Pinecone, Neo4j) at the same time and return their results.
+    
+    Worker threads get this session's script context so they can use st.session_state and caches."""
+    ctx = get_script_run_ctx()
+    
+    def _with_ctx(probe):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return probe()
+    
+    async def _gather():
+        return await asyncio.gather(*(asyncio.to_thread(_with_ctx, probe) for probe in probes))
+    
+    return asyncio.run(_gather())
+
 def get_pipeline_status():
     """Check the status of each pipeline step."""
+    # The three probes are independent I/O, so they run concurrently
+    snapshot, kg_completed, vectordb_completed = run_concurrently(
+        _status_snapshot, check_neo4j_connection_cached, check_pinecone_connection_cached
+    )
     status = {
         "crawl": {
-            "completed": config.MARKDOWN_DIR.exists() and any(config.MARKDOWN_DIR.rglob("*.md")),
+            "completed": snapshot["has_markdown"],
             "path": config.MARKDOWN_DIR,
             "description": "Web content crawling and markdown extraction"
         },
         "kg": {
-            "completed": check_neo4j_connection_cached(),
+            "completed": kg_completed,
             "path": "Neo4j Aura",
             "description": "Knowledge graph extraction and storage in Neo4j"
         },
         "vectordb": {
-            "completed": check_pinecone_connection_cached(),
+            "completed": vectordb_completed,
             "path": "Pinecone Cloud",
             "description": "Vector database creation in Pinecone for semantic search"
         }
@@ -297,9 +431,7 @@ def show_pipeline_overview():
         st.markdown("### 🕷️ Web Crawling")
         if status["crawl"]["completed"]:
             st.markdown('<div class="status-card">✅ Completed</div>', unsafe_allow_html=True)
-            if config.MARKDOWN_DIR.exists():
-                md_files = list(config.MARKDOWN_DIR.rglob("*.md"))
-                st.metric("Markdown Files", len(md_files))
+            st.metric("Markdown Files", len(list_markdown_files()))
         else:
             st.markdown('<div class="status-card warning">⏳ Not Started</div>', unsafe_allow_html=True)
     
@@ -318,6 +450,10 @@ def show_pipeline_overview():
                 st.caption(f"Error: {conn_state['error'][:50]}...")
             else:
                 st.markdown('<div class="status-card warning">⏳ Not Started</div>', unsafe_allow_html=True)
+            # An extracted graph that has not reached Neo4j is still worth reporting
+            local_counts = kg_summary()
+            if local_counts:
+                st.caption(f"Local KG file: {local_counts[0]} entities, {local_counts[1]} relationships")
     
     with col3:
         st.markdown("### 🔍 Vector Database (Pinecone)")
@@ -325,15 +461,7 @@ def show_pipeline_overview():
         
         if status["vectordb"]["completed"]:
             st.markdown('<div class="status-card">✅ Completed</div>', unsafe_allow_html=True)
-            try:
-                from src.modules.vector_db_builder import get_pinecone_index
-                index = get_pinecone_index()
-                stats = index.describe_index_stats()
-                namespace_stats = stats.get('namespaces', {}).get(config.PINECONE_NAMESPACE, {})
-                vector_count = namespace_stats.get('vector_count', 0)
-                st.metric("Vectors", vector_count)
-            except:
-                st.metric("Status", "Connected")
+            st.metric("Vectors", conn_state.get('vector_count', 0))
         else:
             if conn_state['error']:
                 st.markdown('<div class="status-card error">❌ Connection Error</div>', unsafe_allow_html=True)
@@ -366,6 +494,7 @@ def show_pipeline_overview():
     
     # Pipeline execution
     st.markdown("### 🚀 Pipeline Execution")
+    show_pipeline_job()
     
     col1, col2, col3 = st.columns(3)
     
@@ -387,45 +516,79 @@ def show_pipeline_overview():
     if st.button("🚀 Run Full Pipeline", type="primary"):
         run_pipeline_step("all")
 
-def run_pipeline_step(step):
-    """Run a specific pipeline step."""
+@st.cache_resource
+def get_pipeline_executor():
+    """Single background worker that runs pipeline steps off the Streamlit script thread."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+
+def _run_pipeline_step_sync(step):
+    """Run a pipeline step in-process with the already-imported modules."""
     if step == "crawl":
-        with st.spinner("🕷️ Crawling websites and extracting content..."):
-            try:
-                asyncio.run(crawler.build_knowledge_graph())
-                st.success("✅ Crawling completed!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Crawling failed: {e}")
-    
+        asyncio.run(crawler.run_crawl())
     elif step == "kg":
-        with st.spinner("🧠 Building knowledge graph..."):
-            try:
-                asyncio.run(kg_builder.build_knowledge_graph())
-                st.success("✅ Knowledge graph built!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Knowledge graph building failed: {e}")
-    
+        asyncio.run(kg_builder.build_knowledge_graph())
     elif step == "vectordb":
-        with st.spinner("🔍 Building vector database..."):
-            try:
-                vector_db_builder.build_vector_database()
-                st.success("✅ Vector database built!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Vector database building failed: {e}")
-    
+        vector_db_builder.build_vector_database()
     elif step == "all":
-        with st.spinner("🚀 Running full pipeline..."):
-            try:
-                # Run all steps in sequence
-                asyncio.run(kg_builder.build_knowledge_graph())
-                vector_db_builder.build_vector_database()
-                st.success("✅ Full pipeline completed!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Pipeline failed: {e}")
+        # Run all steps in sequence
+        asyncio.run(kg_builder.build_knowledge_graph())
+        vector_db_builder.build_vector_database()
+
+PIPELINE_STEP_LABELS = {
+    "crawl": "🕷️ Crawling",
+    "kg": "🧠 Knowledge graph building",
+    "vectordb": "🔍 Vector database building",
+    "all": "🚀 Full pipeline"
+}
+
+def run_pipeline_step(step):
+    """Start a pipeline step in the background; progress is shown by show_pipeline_job()."""
+    job = st.session_state.get("pipeline_job")
+    if job and not job["future"].done():
+        st.warning(f"{PIPELINE_STEP_LABELS[job['step']]} is already running.")
+        return
+    
+    future = get_pipeline_executor().submit(_run_pipeline_step_sync, step)
+    st.session_state.pipeline_job = {"step": step, "future": future, "started": time.time()}
+    st.rerun()
+
+def show_pipeline_job():
+    """Show the state of the background pipeline step: live progress while it runs, then its result."""
+    job = st.session_state.get("pipeline_job")
+    if not job:
+        return
+    
+    if not job["future"].done():
+        _pipeline_job_progress()
+        return
+    
+    label = PIPELINE_STEP_LABELS[job["step"]]
+    future = job["future"]
+    del st.session_state.pipeline_job
+    error = future.exception()
+    if error:
+        st.error(f"❌ {label} failed: {error}")
+    else:
+        st.success(f"✅ {label} completed!")
+        # The step changed what is on disk / in the databases
+        _list_md_files.clear()
+        list_document_names.clear()
+        _status_snapshot.clear()
+        _doc_index_connection.clear()
+        refresh_connection_status()
+
+@st.fragment(run_every=2)
+def _pipeline_job_progress():
+    """Progress line for the running step; only this fragment reruns while polling.
+    
+    Once the step finishes, one full rerun lets show_pipeline_job report the result and refresh
+    the caches; the fragment is not rendered again, so polling stops."""
+    job = st.session_state.get("pipeline_job")
+    if not job:
+        return
+    if job["future"].done():
+        st.rerun()
+    st.info(f"⏳ {PIPELINE_STEP_LABELS[job['step']]} running... ({time.time() - job['started']:.0f}s elapsed)")
 
 def show_documents():
     """Display document browser and content viewer."""
@@ -436,14 +599,18 @@ def show_documents():
         return
     
     # Get all markdown files
-    md_files = list(config.MARKDOWN_DIR.rglob("*.md"))
+    file_names = list_document_names()
     
-    if not md_files:
+    if not file_names:
         st.warning("⚠️ No markdown files found in the output directory.")
         return
     
+    _document_viewer(file_names)
+
+@st.fragment
+def _document_viewer(file_names):
+    """Document selector, content and stats; picking another document reruns only this fragment."""
     # File selector
-    file_names = [f.relative_to(config.MARKDOWN_DIR) for f in md_files]
     selected_file_name = st.selectbox("📁 Select a document:", file_names)
     
     if selected_file_name:
@@ -453,11 +620,20 @@ def show_documents():
         st.markdown(f"### 📄 {selected_file_name}")
         
         try:
-            content = selected_file.read_text(encoding="utf-8")
+            file_stat = selected_file.stat()
+            content, doc_stats = _read_md(str(selected_file), file_stat.st_mtime, file_stat.st_size)
+            
+            # Large crawl dumps render a preview unless the full document is requested
+            shown = content
+            if len(content) > DOC_PREVIEW_CHARS and not st.toggle(
+                "Show full document", help=f"Only the first {DOC_PREVIEW_CHARS:,} characters are rendered by default"
+            ):
+                shown = content[:DOC_PREVIEW_CHARS]
+                st.caption(f"Showing the first {DOC_PREVIEW_CHARS:,} of {len(content):,} characters")
             
             # Content display with styling
             st.markdown('<div class="markdown-content">', unsafe_allow_html=True)
-            st.markdown(content)
+            st.markdown(shown)
             st.markdown('</div>', unsafe_allow_html=True)
         
         except Exception as e:
@@ -469,126 +645,346 @@ def show_documents():
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Characters", len(content))
+            st.metric("Characters", doc_stats["characters"])
         with col2:
-            st.metric("Lines", content.count('\n') + 1)
+            st.metric("Lines", doc_stats["lines"])
         with col3:
-            st.metric("Words", len(content.split()))
+            st.metric("Words", doc_stats["words"])
         with col4:
-            st.metric("File Size", f"{selected_file.stat().st_size / 1024:.1f} KB")
+            st.metric("File Size", f"{doc_stats['size_kb']:.1f} KB")
 
 def create_network_graph(entities, relationships, original_matches=None):
-    """Create an interactive network graph using pyvis with highlighting for original matches."""
+    """Create an interactive network graph using pyvis with highlighting for original matches.
     
+    Returns the graph's HTML, cached per distinct set of nodes, edges and matches."""
     try:
-        # Create pyvis network
-        net = Network(height="400px", width="100%", bgcolor="#222222", font_color="white")
-        
-        # Configure physics
-        net.set_options("""
-        var options = {
-          "physics": {
-            "enabled": true,
-            "barnesHut": {
-              "gravitationalConstant": -30000,
-              "centralGravity": 0.3,
-              "springLength": 95,
-              "springConstant": 0.04,
-              "damping": 0.09,
-              "avoidOverlap": 0.1
-            },
-            "maxVelocity": 26,
-            "minVelocity": 0.1,
-            "timestep": 0.35,
-            "stabilization": {"iterations": 150}
-          }
-        }
-        """)
-        
-        # Color scheme for different entity types
-        type_colors = {
-            "satellite": "#FF6B6B",      # Red
-            "organization": "#4ECDC4",   # Teal  
-            "instrument": "#45B7D1",     # Blue
-            "data_product": "#96CEB4",   # Green
-            "parameter": "#FECA57",      # Yellow
-            "mission": "#FF9FF3",        # Pink
-            "service": "#54A0FF",        # Light Blue
-            "application": "#5F27CD",    # Purple
-            "technology": "#00D2D3"      # Cyan
-        }
-        
-        # Set to track original matches for highlighting
-        original_match_set = set(original_matches) if original_matches else set()
-        
-        # Add nodes with different styling for original matches
-        for entity in entities:
-            entity_name = entity['name']
-            entity_type = entity.get('type', 'unknown')
-            
-            # Determine color and size based on whether it's an original match
-            is_original = entity_name in original_match_set
-            base_color = type_colors.get(entity_type, "#95A5A6")
-            
-            if is_original:
-                # Original matches: larger, brighter, with border
-                color = base_color
-                size = 25
-                borderWidth = 4
-                borderColor = "#FFD700"  # Gold border for original matches
-                title = f"🎯 ORIGINAL MATCH\nName: {entity_name}\nType: {entity_type}"
-            else:
-                # Expanded nodes: smaller, slightly transparent
-                color = base_color + "CC"  # Add transparency
-                size = 15
-                borderWidth = 1
-                borderColor = "#FFFFFF"
-                title = f"🔗 Connected Node\nName: {entity_name}\nType: {entity_type}"
-            
-            net.add_node(
-                entity_name, 
-                label=entity_name.replace('_', ' ').title(),
-                color=color,
-                size=size,
-                title=title,
-                borderWidth=borderWidth,
-                shapeProperties={"borderDashes": False if is_original else [5, 5]}
-            )
+        return build_network_html(
+            tuple((e['name'], e.get('type', 'unknown')) for e in entities),
+            tuple((r['source'], r['target'], r['relation']) for r in relationships),
+            frozenset(original_matches or ())
+        )
+    except Exception as e:
+        st.error(f"Error creating network graph: {e}")
+        return None
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_network_html(entities_key, rels_key, originals_key):
+    """Build the pyvis graph for (name, type) nodes and (source, target, relation) edges as HTML."""
+    # Create pyvis network
+    net = Network(height="400px", width="100%", bgcolor="#222222", font_color="white")
+    
+    # Configure physics
+    net.set_options("""
+    var options = {
+      "physics": {
+        "enabled": true,
+        "barnesHut": {
+          "gravitationalConstant": -30000,
+          "centralGravity": 0.3,
+          "springLength": 95,
+          "springConstant": 0.04,
+          "damping": 0.09,
+          "avoidOverlap": 0.1
+        },
+        "maxVelocity": 26,
+        "minVelocity": 0.1,
+        "timestep": 0.35,
+        "stabilization": {"iterations": 150}
+      }
+    }
+    """)
+    
+    # Color scheme for different entity types
+    type_colors = {
+        "satellite": "#FF6B6B",      # Red
+        "organization": "#4ECDC4",   # Teal  
+        "instrument": "#45B7D1",     # Blue
+        "data_product": "#96CEB4",   # Green
+        "parameter": "#FECA57",      # Yellow
+        "mission": "#FF9FF3",        # Pink
+        "service": "#54A0FF",        # Light Blue
+        "application": "#5F27CD",    # Purple
+        "technology": "#00D2D3"      # Cyan
+    }
+    
+    # Add nodes with different styling for original matches
+    for entity_name, entity_type in entities_key:
+        # Determine color and size based on whether it's an original match
+        is_original = entity_name in originals_key
+        base_color = type_colors.get(entity_type, "#95A5A6")
         
-        # Add edges with different styles for connections to original matches
-        for rel in relationships:
-            source_is_original = rel['source'] in original_match_set
-            target_is_original = rel['target'] in original_match_set
-            
-            # Style edge based on connection to original matches
-            if source_is_original or target_is_original:
-                # Connection involves an original match - make it prominent
-                color = "#FFD700"  # Gold
-                width = 3
-            else:
-                # Connection between expanded nodes - make it subtle
-                color = "#95A5A6"  # Gray
-                width = 1
-            
-            net.add_edge(
-                rel['source'], 
-                rel['target'],
-                label=rel['relation'].replace('_', ' ').title(),
-                color=color,
-                width=width,
-                title=f"Relationship: {rel['relation']}"
-            )
+        if is_original:
+            # Original matches: larger, brighter, with border
+            color = base_color
+            size = 25
+            borderWidth = 4
+            borderColor = "#FFD700"  # Gold border for original matches
+            title = f"🎯 ORIGINAL MATCH\nName: {entity_name}\nType: {entity_type}"
+        else:
+            # Expanded nodes: smaller, slightly transparent
+            color = base_color + "CC"  # Add transparency
+            size = 15
+            borderWidth = 1
+            borderColor = "#FFFFFF"
+            title = f"🔗 Connected Node\nName: {entity_name}\nType: {entity_type}"
         
-        # Save to temporary file
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8')
-        net.save_graph(temp_file.name)
-        temp_file.close()
+        net.add_node(
+            entity_name, 
+            label=entity_name.replace('_', ' ').title(),
+            color=color,
+            size=size,
+            title=title,
+            borderWidth=borderWidth,
+            shapeProperties={"borderDashes": False if is_original else [5, 5]}
+        )
+    
+    # Add edges with different styles for connections to original matches
+    for source, target, relation in rels_key:
+        source_is_original = source in originals_key
+        target_is_original = target in originals_key
         
-        return temp_file.name
+        # Style edge based on connection to original matches
+        if source_is_original or target_is_original:
+            # Connection involves an original match - make it prominent
+            color = "#FFD700"  # Gold
+            width = 3
+        else:
+            # Connection between expanded nodes - make it subtle
+            color = "#95A5A6"  # Gray
+            width = 1
         
-    except Exception as e:
-        st.error(f"Error creating network graph: {e}")
-        return None
+        net.add_edge(
+            source, 
+            target,
+            label=relation.replace('_', ' ').title(),
+            color=color,
+            width=width,
+            title=f"Relationship: {relation}"
+        )
+    
+    return net.generate_html(notebook=False)
+
+KG_SNAPSHOT_QUERY = """
+CALL { MATCH (n:Entity) RETURN collect({name: n.name, type: n.type}) AS entities }
+CALL {
+    MATCH (source:Entity)-[r:RELATES]->(target:Entity)
+    RETURN collect({source: source.name, target: target.name, relation: r.relation}) AS relationships
+}
+RETURN entities, relationships
+"""
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _load_kg_snapshot():
+    """Load all entities and relationships from Neo4j, with the entity/relationship tables and
+    type counts computed once per snapshot in pandas."""
+    entities = []
+    relationships = []
+    
+    session = get_neo4j_session()
+    if session:
+        # Entities and relationships in one round trip
+        try:
+            record = session.execute_read(lambda tx: tx.run(KG_SNAPSHOT_QUERY).single())
+        finally:
+            session.close()
+        entities = record["entities"]
+        relationships = record["relationships"]
+    
+    entity_df = pd.DataFrame(entities, columns=["name", "type"])
+    type_counts = entity_df["type"].fillna("Unknown").value_counts()
+    rel_df = pd.DataFrame(relationships, columns=["source", "target", "relation"])
+    return entities, relationships, entity_df, type_counts, rel_df
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def _kg_search_index():
+    """Search index over the snapshot's entity names, built once and shared read-only.
+    
+    Holds the entities, their lowercased names joined by newlines (for substring scans), the
+    offset where each name starts, and a map from each name word to the entities containing it."""
+    entities = _load_kg_snapshot()[0]
+    lowered = [entity['name'].lower() for entity in entities]
+    starts, offset = [], 0
+    for name in lowered:
+        starts.append(offset)
+        offset += len(name) + 1
+    words = {}
+    for i, name in enumerate(lowered):
+        for word in set(name.replace('_', ' ').split()):
+            words.setdefault(word, []).append(i)
+    return entities, "\n".join(lowered), starts, words
+
+def search_entities(search_term):
+    """Entities matching search_term by the rules of smart_entity_search, using _kg_search_index.
+    
+    Whole-name rules are substring scans over the joined names; the word-overlap rule compares
+    against each distinct name word once instead of once per entity."""
+    entities, haystack, starts, words = _kg_search_index()
+    term = search_term.lower()
+    normalized = kg_builder.normalize_name(search_term)
+    if not normalized:
+        return list(entities)  # An empty normalized term is contained in every name
+    
+    matched = set()
+    needles = {normalized, term} | {word for word in term.split() if len(word) > 2}
+    for needle in needles:
+        if "\n" in needle:
+            continue
+        pos = haystack.find(needle)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            matched.add(i)
+            # Continue from the next name; this one already matched
+            pos = haystack.find(needle, starts[i + 1]) if i + 1 < len(starts) else -1
+    
+    search_words = [word for word in term.replace('-', ' ').replace('_', ' ').split() if len(word) > 2]
+    for word, indices in words.items():
+        if any(search_word in word or word in search_word for search_word in search_words):
+            matched.update(indices)
+    
+    return [entities[i] for i in sorted(matched)]
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def _kg_adjacency():
+    """(relationships, adjacency) for the snapshot, built once and shared read-only; see build_adjacency."""
+    relationships = _load_kg_snapshot()[1]
+    return relationships, build_adjacency(relationships)
+
+def relationships_among(names):
+    """Snapshot relationships with both ends in `names`, found through the adjacency of those names only."""
+    relationships, adjacency = _kg_adjacency()
+    indices = {i for name in names for i in adjacency.get(name, ())}
+    return [
+        relationships[i] for i in sorted(indices)
+        if relationships[i]['source'] in names and relationships[i]['target'] in names
+    ]
+
+def clear_kg_caches():
+    """Drop the cached KG snapshot and everything derived from it."""
+    _load_kg_snapshot.clear()
+    _kg_search_index.clear()
+    _kg_adjacency.clear()
+    load_search_subgraph.clear()
+
+# Search expansion runs on the server: APOC's BFS spanning tree when the plugin is installed,
+# otherwise a hop-by-hop BFS in plain Cypher. Either way only the subgraph comes back.
+SUBGRAPH_MAX_NODES = 2000  # Expansion stops once this many entities are reached
+SUBGRAPH_MAX_RELATIONSHIPS = 10000  # Relationships returned between the expanded entities
+
+SUBGRAPH_APOC_QUERY = """
+CALL {
+    MATCH (seed:Entity) WHERE seed.name IN $seeds
+    RETURN seed AS n, 0 AS depth
+    UNION ALL
+    MATCH (seed:Entity) WHERE seed.name IN $seeds
+    CALL apoc.path.spanningTree(seed, {maxLevel: $depth, relationshipFilter: 'RELATES', labelFilter: '+Entity', limit: $limit})
+    YIELD path
+    RETURN last(nodes(path)) AS n, length(path) AS depth
+}
+WITH n, min(depth) AS depth
+ORDER BY depth
+LIMIT $limit
+RETURN n.name AS name, n.type AS type, depth
+"""
+
+# One BFS level: distinct unseen neighbours of the frontier, so no paths are enumerated
+SUBGRAPH_HOP_QUERY = """
+MATCH (n:Entity)-[:RELATES]-(m:Entity)
+WHERE n.name IN $frontier AND NOT m.name IN $seen
+RETURN DISTINCT m.name AS name
+LIMIT $limit
+"""
+
+SUBGRAPH_NODES_QUERY = """
+MATCH (n:Entity) WHERE n.name IN $names
+RETURN n.name AS name, n.type AS type
+"""
+
+SUBGRAPH_RELATIONSHIPS_QUERY = """
+MATCH (source:Entity)-[r:RELATES]->(target:Entity)
+WHERE source.name IN $names AND target.name IN $names
+RETURN source.name AS source, target.name AS target, r.relation AS relation
+LIMIT $limit
+"""
+
+def _expand_apoc(tx, seeds, depth):
+    """(name, type, depth) rows reached from the seeds through apoc.path.spanningTree."""
+    return tx.run(SUBGRAPH_APOC_QUERY, seeds=seeds, depth=depth, limit=SUBGRAPH_MAX_NODES).data()
+
+def _expand_hops(tx, seeds, depth):
+    """(name, type, depth) rows reached from the seeds, one DISTINCT hop query per BFS level."""
+    depths = dict.fromkeys(seeds, 0)
+    frontier = list(seeds)
+    for level in range(1, depth + 1):
+        if not frontier or len(depths) >= SUBGRAPH_MAX_NODES:
+            break
+        records = tx.run(
+            SUBGRAPH_HOP_QUERY, frontier=frontier, seen=list(depths), limit=SUBGRAPH_MAX_NODES - len(depths)
+        )
+        frontier = [record["name"] for record in records]
+        depths.update(dict.fromkeys(frontier, level))
+    rows = tx.run(SUBGRAPH_NODES_QUERY, names=list(depths)).data()
+    for row in rows:
+        row["depth"] = depths[row["name"]]
+    return rows
+
+def _read_subgraph(tx, expand, seeds, types, depth):
+    """(rows of the selected types, relationships among them, whether a size cap was hit)."""
+    reached = expand(tx, seeds, depth)
+    rows = [row for row in reached if row["type"] in types]
+    names = [row["name"] for row in rows]
+    relationships = tx.run(SUBGRAPH_RELATIONSHIPS_QUERY, names=names, limit=SUBGRAPH_MAX_RELATIONSHIPS).data()
+    truncated = len(reached) >= SUBGRAPH_MAX_NODES or len(relationships) >= SUBGRAPH_MAX_RELATIONSHIPS
+    return rows, relationships, truncated
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_search_subgraph(seeds, types, depth):
+    """Expand the seed entities up to `depth` hops in Neo4j and keep the entities of the selected types.
+    
+    Returns the same dictionary as find_connected_subgraph, for the subgraph only, with
+    "truncated" set when SUBGRAPH_MAX_NODES or SUBGRAPH_MAX_RELATIONSHIPS cut the result."""
+    seeds, types = list(seeds), set(types)
+    session = get_neo4j_session()
+    if not session:
+        raise RuntimeError("No Neo4j session available")
+    try:
+        try:
+            rows, relationships, truncated = session.execute_read(_read_subgraph, _expand_apoc, seeds, types, depth)
+        except ClientError as e:
+            logging.info(f"APOC unavailable, expanding search hop by hop: {e}")
+            rows, relationships, truncated = session.execute_read(_read_subgraph, _expand_hops, seeds, types, depth)
+    finally:
+        session.close()
+    
+    depths = {row["name"]: row["depth"] for row in rows}
+    return {
+        "entities": [{"name": row["name"], "type": row["type"]} for row in rows],
+        "relationships": relationships,
+        "depths": depths,
+        "original_matches": seeds,
+        "expanded_count": len(rows) - len(seeds),
+        "max_depth_used": max(depths.values()) if depths else 0,
+        "truncated": truncated
+    }
+
+# Charts are cached as shared objects (cache_resource): cache_data would unpickle, and so
+# re-validate, a fresh Figure on every rerun; st.plotly_chart only reads them
+
+@st.cache_resource(max_entries=64)
+def _entity_type_pie(labels, values):
+    """Entity-type pie chart, built once per distinct set of counts."""
+    fig = go.Figure(go.Pie(labels=list(labels), values=list(values)))
+    fig.update_layout(title="Entity Distribution by Type (Filtered)")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def _relation_type_bar(labels, values):
+    """Top relationship types bar chart, built once per distinct set of counts."""
+    fig = go.Figure(go.Bar(x=list(labels), y=list(values)))
+    fig.update_layout(title="Top 10 Relationship Types (Filtered)", xaxis_tickangle=45)
+    return fig
+
+RAW_PREVIEW_ROWS = 50  # Entities/relationships shown in the KG "Raw Data" tab
+REL_TABLE_PAGE_SIZE = 500  # Rows per page of the KG relationship table
 
 def show_knowledge_graph():
     """Display and visualize the knowledge graph."""
@@ -599,25 +995,13 @@ def show_knowledge_graph():
         st.warning("⚠️ Neo4j knowledge graph not found. Run the KG building step first.")
         return
     
+    # The graph is cached for 10 minutes; reload on demand after external changes
+    if st.button("🔄 Reload Graph", help="Fetch entities and relationships from Neo4j again"):
+        clear_kg_caches()
+    
     try:
-        entities = []
-        relationships = []
-        
-        # Load from Neo4j
-        session = get_neo4j_session()
-        if session:
-            # Get entities
-            entity_result = session.run("MATCH (n:Entity) RETURN n.name as name, n.type as type")
-            entities = [{"name": record["name"], "type": record["type"]} for record in entity_result]
-            
-            # Get relationships
-            rel_result = session.run("""
-                MATCH (source:Entity)-[r:RELATES]->(target:Entity) 
-                RETURN source.name as source, target.name as target, r.relation as relation
-            """)
-            relationships = [{"source": record["source"], "target": record["target"], "relation": record["relation"]} for record in rel_result]
-            
-            session.close()
+        # Load from Neo4j (cached across reruns)
+        entities, relationships, entity_df_all, type_counts_all, rel_df_all = _load_kg_snapshot()
         
         # Summary metrics
         col1, col2, col3 = st.columns(3)
@@ -626,9 +1010,17 @@ def show_knowledge_graph():
         with col2:
             st.metric("🔗 Total Relationships", len(relationships))
         with col3:
-            entity_types = [e.get("type", "Unknown") for e in entities]
-            st.metric("📋 Entity Types", len(set(entity_types)))
+            st.metric("📋 Entity Types", type_counts_all.size)
         
+        _kg_interactive_view(entities, relationships, entity_df_all, type_counts_all, rel_df_all)
+    
+    except Exception as e:
+        st.error(f"Error loading knowledge graph: {e}")
+
+@st.fragment
+def _kg_interactive_view(entities, relationships, entity_df_all, type_counts_all, rel_df_all):
+    """Filters, search and the KG tabs; widget changes here rerun only this fragment."""
+    try:
         # Interactive controls
         st.markdown("### 🎮 Interactive Controls")
         
@@ -636,7 +1028,7 @@ def show_knowledge_graph():
         
         with col1:
             # Entity type filter
-            all_types = sorted(set(entity_types))
+            all_types = sorted(type_counts_all.index)
             selected_types = st.multiselect(
                 "🏷️ Filter by Entity Type:",
                 all_types,
@@ -681,35 +1073,39 @@ def show_knowledge_graph():
         # Filter entities and relationships based on selection
         filtered_entities = []
         
-        # First, find entities that match the search term
+        # First, find entities that match the search term (via the snapshot's search index)
+        type_set = set(selected_types)
         matching_entities = []
-        for entity in entities:
-            # Apply type filter
-            if entity['type'] not in selected_types:
-                continue
-            # Apply smart search filter
-            if search_term:
-                if smart_entity_search(entity['name'], search_term):
-                    matching_entities.append(entity)
-            else:
-                filtered_entities.append(entity)
+        if search_term:
+            matching_entities = [e for e in search_entities(search_term) if e['type'] in type_set]
+        else:
+            filtered_entities = [e for e in entities if e['type'] in type_set]
         
         # If search term is provided, expand to include all connected nodes
         if search_term and matching_entities:
-            # Use BFS to find all connected entities
+            # Neo4j runs the BFS and type filter, returning only the subgraph
             max_depth = locals().get('max_depth', 3)  # Default to 3 if not set
-            subgraph_result = find_connected_subgraph(matching_entities, entities, relationships, max_depth)
-            filtered_entities = subgraph_result["entities"]
-            
-            # Apply type filter to the expanded results
-            filtered_entities = [e for e in filtered_entities if e['type'] in selected_types]
-            
-            # Filter relationships to only include filtered entities
-            filtered_entity_names = {e['name'] for e in filtered_entities}
-            filtered_relationships = [
-                rel for rel in relationships 
-                if rel['source'] in filtered_entity_names and rel['target'] in filtered_entity_names
-            ]
+            try:
+                subgraph_result = load_search_subgraph(
+                    tuple(sorted(e['name'] for e in matching_entities)), tuple(sorted(selected_types)), max_depth
+                )
+                filtered_entities = subgraph_result["entities"]
+                filtered_relationships = subgraph_result["relationships"]
+                if subgraph_result["truncated"]:
+                    st.warning(f"Large neighbourhood: showing at most {SUBGRAPH_MAX_NODES} entities and {SUBGRAPH_MAX_RELATIONSHIPS} relationships. Lower the BFS depth or narrow the search.")
+            except Exception as e:
+                # Expand over the loaded snapshot instead
+                logging.warning(f"Server-side search expansion failed, using local BFS: {e}")
+                snapshot_relationships, adjacency = _kg_adjacency()
+                subgraph_result = find_connected_subgraph(
+                    matching_entities, entities, snapshot_relationships, max_depth, adjacency=adjacency
+                )
+                
+                # Apply type filter to the expanded results
+                filtered_entities = [e for e in subgraph_result["entities"] if e['type'] in selected_types]
+                
+                # Filter relationships to only include filtered entities
+                filtered_relationships = relationships_among({e['name'] for e in filtered_entities})
             
             # Show expansion information with depth details
             original_matches = subgraph_result["original_matches"]
@@ -721,10 +1117,8 @@ def show_knowledge_graph():
                 
                 # Show depth distribution
                 depths = subgraph_result["depths"]
-                depth_counts = {}
-                for entity_name, depth in depths.items():
-                    if any(e['name'] == entity_name and e['type'] in selected_types for e in entities):
-                        depth_counts[depth] = depth_counts.get(depth, 0) + 1
+                # One pass over the (already type-filtered) expanded entities
+                depth_counts = Counter(depths[e['name']] for e in filtered_entities)
                 
                 depth_info = " | ".join([f"Depth {d}: {count}" for d, count in sorted(depth_counts.items())])
                 st.caption(f"📊 Distribution: {depth_info}")
@@ -732,12 +1126,8 @@ def show_knowledge_graph():
                 st.info(f"🎯 Found {len(original_matches)} matching entities (no additional connections within depth {max_depth})")
                 
         else:
-            # No search term - filter relationships normally
-            filtered_entity_names = {e['name'] for e in filtered_entities}
-            filtered_relationships = [
-                rel for rel in relationships 
-                if rel['source'] in filtered_entity_names and rel['target'] in filtered_entity_names
-            ]
+            # No search term - keep relationships between the type-filtered entities
+            filtered_relationships = relationships_among({e['name'] for e in filtered_entities})
         
         st.info(f"Showing {len(filtered_entities)} entities and {len(filtered_relationships)} relationships")
         
@@ -774,15 +1164,10 @@ def show_knowledge_graph():
                 if search_term and 'subgraph_result' in locals():
                     original_matches_list = subgraph_result.get("original_matches", [])
                 
-                graph_file = create_network_graph(filtered_entities, filtered_relationships, original_matches_list)
-                if graph_file:
+                graph_html = create_network_graph(filtered_entities, filtered_relationships, original_matches_list)
+                if graph_html:
                     # Display the graph
-                    with open(graph_file, 'r', encoding='utf-8') as f:
-                        graph_html = f.read()
                     st.components.v1.html(graph_html, height=500)
-                    
-                    # Clean up temp file
-                    os.unlink(graph_file)
                 
                 # Add legend for the visualization
                 if search_term and original_matches_list:
@@ -857,14 +1242,14 @@ def show_knowledge_graph():
         with tab2:
             # Entity type distribution
             if filtered_entities:
-                entity_df = pd.DataFrame(filtered_entities)
-                type_counts = entity_df['type'].value_counts()
+                # Unfiltered views reuse the snapshot's precomputed table and counts
+                if len(filtered_entities) == len(entities):
+                    entity_df, type_counts = entity_df_all, type_counts_all
+                else:
+                    entity_df = pd.DataFrame(filtered_entities)
+                    type_counts = pd.Series(Counter(e.get('type') or "Unknown" for e in filtered_entities))
                 
-                fig = px.pie(
-                    values=type_counts.values,
-                    names=type_counts.index,
-                    title="Entity Distribution by Type (Filtered)"
-                )
+                fig = _entity_type_pie(tuple(type_counts.index), tuple(int(v) for v in type_counts.values))
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Entity table with search
@@ -878,7 +1263,8 @@ def show_knowledge_graph():
                 
                 if selected_entity:
                     # Find all relationships for this entity
-                    entity_rels = [r for r in relationships if r['source'] == selected_entity or r['target'] == selected_entity]
+                    snapshot_relationships, adjacency = _kg_adjacency()
+                    entity_rels = [snapshot_relationships[i] for i in adjacency.get(selected_entity, ())]
                     
                     st.write(f"**{selected_entity}** has {len(entity_rels)} connections:")
                     for rel in entity_rels:
@@ -894,19 +1280,20 @@ def show_knowledge_graph():
             st.markdown("### 🔗 Relationship Analysis")
             
             if filtered_relationships:
-                # Create a simple network representation
-                rel_df = pd.DataFrame(filtered_relationships)
-                st.dataframe(rel_df, use_container_width=True)
+                # Create a simple network representation (unfiltered views reuse the snapshot's table)
+                rel_df = rel_df_all if len(filtered_relationships) == len(relationships) else pd.DataFrame(filtered_relationships)
+                
+                # Only one page of the table is sent to the browser
+                page_count = max(1, -(-len(rel_df) // REL_TABLE_PAGE_SIZE))
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="rel_table_page")
+                start = (page - 1) * REL_TABLE_PAGE_SIZE
+                st.dataframe(rel_df.iloc[start:start + REL_TABLE_PAGE_SIZE], use_container_width=True)
+                st.caption(f"Rows {start + 1}-{min(start + REL_TABLE_PAGE_SIZE, len(rel_df))} of {len(rel_df)} (page {page}/{page_count})")
                 
                 # Relationship type distribution
                 if 'relation' in rel_df.columns:
                     rel_counts = rel_df['relation'].value_counts().head(10)
-                    fig = px.bar(
-                        x=rel_counts.index,
-                        y=rel_counts.values,
-                        title="Top 10 Relationship Types (Filtered)"
-                    )
-                    fig.update_layout(xaxis_tickangle=45)
+                    fig = _relation_type_bar(tuple(rel_counts.index), tuple(int(v) for v in rel_counts.values))
                     st.plotly_chart(fig, use_container_width=True)
                 
                 # Relationship search
@@ -1004,15 +1391,89 @@ def show_knowledge_graph():
         
         with tab5:
             st.markdown("### 📄 Raw Knowledge Graph Data")
-            kg_display_data = {
-                "entities": filtered_entities,
-                "relationships": filtered_relationships,
-                "source": "Neo4j Database"
-            }
-            st.json(kg_display_data)
+            # Only a preview is sent to the browser; the full graph is available as a download
+            kg_bytes = kg_file_bytes()
+            if kg_bytes is not None:
+                st.download_button(
+                    "⬇️ Download KG JSON",
+                    data=kg_bytes,
+                    file_name=config.KG_FILE.name,
+                    mime="application/json"
+                )
+            with st.expander(f"Preview first {RAW_PREVIEW_ROWS} entities and relationships", expanded=True):
+                st.json({
+                    "entities": filtered_entities[:RAW_PREVIEW_ROWS],
+                    "relationships": filtered_relationships[:RAW_PREVIEW_ROWS],
+                    "source": "Neo4j Database"
+                })
     
     except Exception as e:
-        st.error(f"Error loading knowledge graph: {e}")
+        st.error(f"Error rendering knowledge graph: {e}")
+
+SUGGESTED_QUESTIONS = [
+    "What are the main objectives of the INSAT-3DR mission?",
+    "What kind of data does the 'Soil Moisture' product provide?",
+    "What is MOSDAC's data access policy?",
+    "Tell me about the Oceansat-2 satellite.",
+    "What instruments are available on INSAT-3D?"
+]
+
+@st.cache_resource(show_spinner=False)
+def _suggested_embeddings():
+    """Embeddings of the suggested questions, encoded once in a single batch for all sessions."""
+    return dict(zip(SUGGESTED_QUESTIONS, get_rag_pipeline().embed_queries(SUGGESTED_QUESTIONS)))
+
+CHAT_HISTORY_KEEP = 20  # Most recent Q&A entries kept in session state; older ones go to CHAT_LOG_FILE
+CHAT_LOG_PAGE_SIZE = 20  # Archived entries shown per page
+
+_CHAT_LOG_LOCK = threading.Lock()
+
+@st.cache_resource
+def _chat_log_connection():
+    """Shared SQLite connection (WAL mode) for archived chat history."""
+    config.CHAT_LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(config.CHAT_LOG_FILE, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS chats (id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT, entry TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS chats_session ON chats (session, id)")
+    return conn
+
+def append_chat(entry):
+    """Add a Q&A entry to this session's history, archiving the oldest beyond CHAT_HISTORY_KEEP."""
+    history = st.session_state.chat_history
+    history.append(entry)
+    if len(history) <= CHAT_HISTORY_KEEP:
+        return
+    overflow = history[:-CHAT_HISTORY_KEEP]
+    del history[:-CHAT_HISTORY_KEEP]
+    try:
+        with _CHAT_LOG_LOCK:
+            conn = _chat_log_connection()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO chats (session, entry) VALUES (?, ?)",
+                    [(st.session_state.chat_session_id, json.dumps(chat)) for chat in overflow]
+                )
+        st.session_state.archived_chats = st.session_state.get("archived_chats", 0) + len(overflow)
+    except Exception as e:
+        logging.error(f"Error archiving chat history: {e}")
+
+def load_archived_chats(offset, limit=CHAT_LOG_PAGE_SIZE):
+    """Archived entries of this session, newest first."""
+    with _CHAT_LOG_LOCK:
+        rows = _chat_log_connection().execute(
+            "SELECT entry FROM chats WHERE session = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+            (st.session_state.chat_session_id, limit, offset)
+        ).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+def clear_archived_chats():
+    with _CHAT_LOG_LOCK:
+        conn = _chat_log_connection()
+        with conn:
+            conn.execute("DELETE FROM chats WHERE session = ?", (st.session_state.chat_session_id,))
+    st.session_state.archived_chats = 0
 
 def show_qa_interface():
     """Interactive Q&A interface."""
@@ -1029,7 +1490,7 @@ def show_qa_interface():
         rag_state = st.session_state.connection_status['rag_system']
         st.error(f"❌ Failed to initialize RAG system: {rag_state.get('error', 'Unknown error')}")
         if st.button("🔄 Retry RAG Initialization"):
-            st.session_state.connection_status['rag_system'] = {'initialized': False, 'instance': None, 'error': None}
+            st.session_state.connection_status['rag_system'] = {'initialized': False, 'error': None}
             st.rerun()
         return
     
@@ -1039,19 +1500,12 @@ def show_qa_interface():
     # Chat interface
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+        st.session_state.chat_session_id = uuid.uuid4().hex
     
     # Suggested questions
     st.markdown("### 💡 Suggested Questions")
-    suggested_questions = [
-        "What are the main objectives of the INSAT-3DR mission?",
-        "What kind of data does the 'Soil Moisture' product provide?",
-        "What is MOSDAC's data access policy?",
-        "Tell me about the Oceansat-2 satellite.",
-        "What instruments are available on INSAT-3D?"
-    ]
-    
     cols = st.columns(3)
-    for i, question in enumerate(suggested_questions):
+    for i, question in enumerate(SUGGESTED_QUESTIONS):
         col = cols[i % 3]
         if col.button(f"❓ {question[:50]}...", key=f"q_{i}"):
             st.session_state.current_question = question
@@ -1067,7 +1521,7 @@ def show_qa_interface():
         if question:
             with st.spinner("🔍 Searching knowledge base..."):
                 try:
-                    result = rag_system.answer_question(question)
+                    result = rag_system.answer_question(question, query_embedding=_suggested_embeddings().get(question))
                     
                     # Handle both old string format and new dict format
                     if isinstance(result, dict):
@@ -1082,7 +1536,7 @@ def show_qa_interface():
                         confidence_scores = []
                     
                     # Add to chat history
-                    st.session_state.chat_history.append({
+                    append_chat({
                         "question": question,
                         "answer": answer,
                         "sources": sources,
@@ -1130,12 +1584,9 @@ def show_qa_interface():
                             with kg_tab1:
                                 # Create interactive network graph
                                 if subgraph["entities"] and subgraph["relationships"]:
-                                    graph_file = create_network_graph(subgraph["entities"], subgraph["relationships"])
-                                    if graph_file:
-                                        with open(graph_file, 'r', encoding='utf-8') as f:
-                                            graph_html = f.read()
+                                    graph_html = create_network_graph(subgraph["entities"], subgraph["relationships"])
+                                    if graph_html:
                                         st.components.v1.html(graph_html, height=400)
-                                        os.unlink(graph_file)
                                 elif subgraph["entities"]:
                                     st.info("Found entities but no relationships to visualize")
                                     for entity in subgraph["entities"][:5]:
@@ -1179,8 +1630,21 @@ def show_qa_interface():
                     avg_confidence = sum(chat['confidence_scores']) / len(chat['confidence_scores'])
                     st.markdown(f"**🎯 Confidence:** {avg_confidence:.3f}")
         
+        # Older entries live in the chat log; only one page of them is read per rerun
+        archived = st.session_state.get("archived_chats", 0)
+        if archived:
+            with st.expander(f"📜 Older questions ({archived})", expanded=False):
+                page_count = -(-archived // CHAT_LOG_PAGE_SIZE)
+                page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="chat_log_page")
+                for chat in load_archived_chats((page - 1) * CHAT_LOG_PAGE_SIZE):
+                    st.markdown(f"**[{chat['timestamp']}] Question:** {chat['question']}")
+                    st.markdown(f"**Answer:** {chat['answer']}")
+                    st.markdown("---")
+        
         if st.button("🗑️ Clear History"):
             st.session_state.chat_history = []
+            if archived:
+                clear_archived_chats()
             st.rerun()
 
 def extract_entities_from_text(text: str, all_entities: list) -> list:
@@ -1233,24 +1697,29 @@ def smart_entity_search(entity_name: str, search_term: str) -> bool:
     
     return False
 
-def find_connected_subgraph(matching_entities: list, all_entities: list, all_relationships: list, max_depth: int = 3) -> dict:
+def build_adjacency(relationships: list) -> dict:
+    """Map each entity name to the indices of the relationships touching it (either direction)."""
+    adjacency = {}
+    for i, rel in enumerate(relationships):
+        adjacency.setdefault(rel['source'], []).append(i)
+        if rel['target'] != rel['source']:
+            adjacency.setdefault(rel['target'], []).append(i)
+    return adjacency
+
+def find_connected_subgraph(matching_entities: list, all_entities: list, all_relationships: list, max_depth: int = 3,
+                            adjacency: dict = None) -> dict:
     """
     Use BFS to find all entities connected to the matching entities up to max_depth.
     Returns a dictionary with expanded entities, relationships, and depth information.
+    `adjacency` is build_adjacency(all_relationships), passed in when it is already cached.
     """
     if not matching_entities:
         return {"entities": [], "relationships": [], "depths": {}, "original_matches": [], "expanded_count": 0}
     
-    # Create adjacency list for efficient graph traversal
-    adjacency = {}
-    for entity in all_entities:
-        adjacency[entity['name']] = []
-    
-    # Build adjacency list from relationships
-    for rel in all_relationships:
-        if rel['source'] in adjacency and rel['target'] in adjacency:
-            adjacency[rel['source']].append(rel['target'])
-            adjacency[rel['target']].append(rel['source'])  # Undirected graph
+    # Adjacency list (name -> relationship indices) for efficient graph traversal
+    if adjacency is None:
+        adjacency = build_adjacency(all_relationships)
+    known_names = {entity['name'] for entity in all_entities}
     
     # BFS to find all connected nodes with depth tracking
     visited = set()
@@ -1275,9 +1744,11 @@ def find_connected_subgraph(matching_entities: list, all_entities: list, all_rel
         if current_depth >= max_depth:
             continue
         
-        # Add all neighbors to queue if not visited
-        for neighbor in adjacency.get(current_entity, []):
-            if neighbor not in visited:
+        # Add all neighbors to queue if not visited (undirected: the other end of each relationship)
+        for i in adjacency.get(current_entity, ()):
+            rel = all_relationships[i]
+            neighbor = rel['target'] if rel['source'] == current_entity else rel['source']
+            if neighbor in known_names and neighbor not in visited:
                 visited.add(neighbor)
                 new_depth = current_depth + 1
                 depths[neighbor] = new_depth
@@ -1289,11 +1760,12 @@ def find_connected_subgraph(matching_entities: list, all_entities: list, all_rel
         if entity['name'] in visited:
             connected_entities.append(entity)
     
-    # Collect all relationships within the connected component
-    connected_relationships = []
-    for rel in all_relationships:
-        if rel['source'] in visited and rel['target'] in visited:
-            connected_relationships.append(rel)
+    # Collect all relationships within the connected component, visiting only the component's adjacency
+    rel_indices = {i for name in visited for i in adjacency.get(name, ())}
+    connected_relationships = [
+        all_relationships[i] for i in sorted(rel_indices)
+        if all_relationships[i]['source'] in visited and all_relationships[i]['target'] in visited
+    ]
     
     return {
         "entities": connected_entities,
@@ -1425,14 +1897,15 @@ def main():
     else:
         st.sidebar.info("💻 CPU Mode")
     
-    # Database status
+    # Database status; on first load both checks go out at once, later reruns hit the session cache
     st.sidebar.markdown("### 🗄️ Database Status")
-    if check_pinecone_connection_cached():
+    pinecone_connected, neo4j_connected = run_concurrently(check_pinecone_connection_cached, check_neo4j_connection_cached)
+    if pinecone_connected:
         st.sidebar.success("📌 Pinecone Connected")
     else:
         st.sidebar.warning("📌 Pinecone Not Connected")
     
-    if check_neo4j_connection_cached():
+    if neo4j_connected:
         st.sidebar.success("🧠 Neo4j Connected")
     else:
         st.sidebar.warning("🧠 Neo4j Not Connected")